@@ -0,0 +1,131 @@
+"""
+CLI startup benchmark.
+
+Measures what `import heda.cli` costs with `python -X importtime`, times a
+few cheap commands end to end, and fails if either exceeds its budget or if
+a heavy dependency is imported eagerly again.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --import-budget-ms 80 --command-budget-ms 250
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules `import heda.cli` must not pull in; subcommands import them on use.
+FORBIDDEN = ["requests", "rich", "jsonschema", "yaml", "tabulate", "dotenv", "numpy"]
+
+COMMANDS = [
+    ["--help"],
+    ["check", "--help"],
+    ["run", "--help"],
+]
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def import_profile() -> Tuple[int, List[Tuple[str, int, int]]]:
+    """
+    Import heda.cli in a fresh interpreter under -X importtime.
+
+    Returns:
+        Cumulative microseconds for heda.cli, and (module, self us,
+        cumulative us) for every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import heda.cli"],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    modules = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.append((name, int(self_us), int(cumulative_us)))
+        if name == "heda.cli":
+            total = int(cumulative_us)
+    return total, modules
+
+
+def time_command(args: List[str], repeat: int) -> float:
+    """Best wall time in milliseconds of `python -m heda <args>`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "heda", *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=_env(),
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--import-budget-ms", type=float, default=100.0,
+                        help="Budget for the cumulative import time of heda.cli.")
+    parser.add_argument("--command-budget-ms", type=float, default=400.0,
+                        help="Budget for the best wall time of each command.")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per measurement; the best one counts.")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of slowest imports to list.")
+    args = parser.parse_args()
+
+    failures = []
+
+    samples = [import_profile() for _ in range(args.repeat)]
+    import_ms = min(total for total, _ in samples) / 1000
+    _, modules = samples[-1]
+    imported = {name for name, _, _ in modules}
+
+    print(f"import heda.cli: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print("\nSlowest imports (self time):")
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[: args.top]
+    for name, self_us, cumulative_us in slowest:
+        print(f"  {self_us / 1000:7.1f} ms  {name}  (cumulative {cumulative_us / 1000:.1f} ms)")
+
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import heda.cli took {import_ms:.1f} ms")
+
+    eager = [name for name in FORBIDDEN if name in imported]
+    if eager:
+        failures.append(f"import heda.cli eagerly imports: {', '.join(eager)}")
+
+    print()
+    for command in COMMANDS:
+        wall_ms = time_command(command, args.repeat)
+        label = "heda " + " ".join(command)
+        print(f"{label:<20} {wall_ms:7.1f} ms (budget {args.command_budget_ms:.0f} ms)")
+        if wall_ms > args.command_budget_ms:
+            failures.append(f"`{label}` took {wall_ms:.1f} ms")
+
+    if failures:
+        print("\nStartup budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nStartup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+from heda.cli import app
+
+app(prog_name="heda")
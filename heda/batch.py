@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from tabulate import tabulate
+
+from heda.ui.progress import parallel_steps
+
+BATCH_LOG_NAME = "run-all.log"
+
+class BatchRunError(Exception):
+    pass
+
+def discover_experiments(root: Path) -> List[Path]:
+    """
+    Find every experiment directory (one containing experiment.yaml) under
+    `root`, skipping hidden directories.
+    """
+    if not root.is_dir():
+        raise BatchRunError(f"{root} is not a directory")
+
+    experiments = []
+    for exp_file in root.rglob("experiment.yaml"):
+        rel_parts = exp_file.relative_to(root).parts[:-1]
+        if any(part.startswith(".") for part in rel_parts):
+            continue
+        experiments.append(exp_file.parent)
+    return sorted(experiments)
+
+def run_all(
+    root: Path,
+    verify: bool = False,
+    jobs: Optional[int] = None,
+    cpus: Optional[float] = None,
+    memory: Optional[str] = None,
+    use_cache: bool = True,
+) -> List[dict]:
+    """
+    Run (or verify) every experiment under `root` through a bounded worker pool.
+
+    Each experiment runs as its own `heda` process in its own directory, since
+    every command works relative to the current experiment. Output goes to
+    `<experiment>/.heda/logs/run-all.log`; containers get the given CPU and
+    memory limits and each experiment keeps its own content-addressed image tag.
+
+    Returns:
+        One result per experiment with its name, status, duration and log path.
+    """
+    experiments = discover_experiments(root)
+    if not experiments:
+        raise BatchRunError(f"No experiment.yaml found under {root}")
+
+    command = "verify" if verify else "run"
+    args = [sys.executable, "-m", "heda", command]
+    if not use_cache:
+        args.append("--no-cache")
+    if cpus is not None:
+        args += ["--cpus", str(cpus)]
+    if memory is not None:
+        args += ["--memory", memory]
+
+    def label(exp_dir: Path) -> str:
+        return exp_dir.relative_to(root).as_posix() or "."
+
+    with parallel_steps() as board:
+        for exp_dir in experiments:
+            board.add(label(exp_dir), f"{command} {label(exp_dir)}")
+
+        def run_one(exp_dir: Path) -> dict:
+            name = label(exp_dir)
+            log_path = exp_dir / ".heda" / "logs" / BATCH_LOG_NAME
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+
+            board.start(name)
+            started = time.monotonic()
+            with open(log_path, "w") as log:
+                result = subprocess.run(
+                    args,
+                    cwd=exp_dir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    env={**os.environ, "NO_COLOR": "1"},
+                )
+            duration = time.monotonic() - started
+
+            if result.returncode == 0:
+                status = "PASS"
+                board.succeed(name)
+            else:
+                status = f"FAIL (exit {result.returncode})"
+                board.fail(name)
+
+            return {
+                "experiment": name,
+                "status": status,
+                "duration": duration,
+                "log": str(log_path),
+            }
+
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            results = list(pool.map(run_one, experiments))
+
+    table = [
+        [r["experiment"], r["status"], f"{r['duration']:.1f}s", r["log"]]
+        for r in results
+    ]
+    print("\nBatch Results:\n")
+    print(tabulate(table, headers=["Experiment", "Status", "Duration", "Log"], tablefmt="github"))
+
+    return results
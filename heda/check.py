@@ -1,88 +1,188 @@
 import json
 from pathlib import Path
-from tabulate import tabulate
-
-from heda.validate import (
-    load_experiment_yaml,
-    validate_experiment,
-    ExperimentValidationError,
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from heda.claim_plan import ClaimPlan, claim_key
+from heda.matrix import CELLS_DIR, matrix_cells
+from heda.utils.metric_stream import (
+    METRICS_STREAM,
+    MetricStreamError,
+    aggregate_records,
+    is_json_array,
+    iter_records,
 )
+from heda.validate import ExperimentValidationError, load_experiment
 
 class ClaimCheckError(Exception):
     pass
 
-OPERATORS = {
-    ">=": lambda actual, expected: actual >= expected,
-    "<=": lambda actual, expected: actual <= expected,
-    "==": lambda actual, expected: actual == expected,
-}
-
-def load_metrics() -> dict:
-    metrics_path = Path("outputs/metrics.json")
-    if not metrics_path.exists():
-        raise ClaimCheckError("outputs/metrics.json not found")
-
-    try:
-        with open(metrics_path, "r") as f:
-            metrics = json.load(f)
-    except json.JSONDecodeError as e:
-        raise ClaimCheckError(f"Invalid metrics.json: {e}")
-
-    if not isinstance(metrics, dict):
-        raise ClaimCheckError("metrics.json must be a JSON object")
-
-    return metrics
+# Larger tables are only written to the report; the console shows a summary.
+CONSOLE_MAX_ROWS = 50
+
+def load_metrics(
+    metrics_path: Path = Path("outputs/metrics.json"),
+    claims: Sequence[dict] = (),
+) -> dict:
+    """
+    Load the metrics `claims` are checked against.
+
+    metrics.json may hold one JSON object or, for per-step/per-sample
+    metrics, a JSON array of objects; a metrics.jsonl next to it is read as
+    a stream of objects as well. Streams are parsed incrementally and only
+    the aggregates the claims ask for are kept: the `aggregate` of a claim
+    ("last", "max", "mean", "p95", ...) is reported under "<aggregate>(<metric>)",
+    and a plain claim on a metric only found in the stream uses its last value.
+    Quantiles are exact, so their metrics' values are held in memory.
+    """
+    stream_path = metrics_path.parent / METRICS_STREAM
+    if not metrics_path.exists() and not stream_path.exists():
+        raise ClaimCheckError(f"{metrics_path.as_posix()} not found")
+
+    metrics: dict = {}
+    stream = stream_path if stream_path.exists() else None
+
+    if metrics_path.exists():
+        if is_json_array(metrics_path):
+            stream = metrics_path
+        else:
+            try:
+                with open(metrics_path, "r") as f:
+                    metrics = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ClaimCheckError(f"Invalid metrics.json: {e}")
+
+            if not isinstance(metrics, dict):
+                raise ClaimCheckError("metrics.json must be a JSON object")
+
+    if stream is None:
+        return metrics
+
+    requested: Dict[str, Set[str]] = {}
+    for claim in claims:
+        aggregate = claim.get("aggregate")
+        if aggregate:
+            requested.setdefault(claim["metric"], set()).add(aggregate)
+        elif claim["metric"] not in metrics:
+            requested.setdefault(claim["metric"], set()).add("last")
 
-def check_claims() -> None:
-    # 1. Load + validate experiment.yaml
     try:
-        experiment = load_experiment_yaml(Path("experiment.yaml"))
-        validate_experiment(experiment)
-    except ExperimentValidationError as e:
-        raise ClaimCheckError(f"Experiment validation failed: {e}")
-
-    # 2. Load metrics
-    metrics = load_metrics()
+        aggregates = aggregate_records(iter_records(stream), requested)
+    except MetricStreamError as e:
+        raise ClaimCheckError(f"Invalid metrics stream: {e}")
 
-    table = []
-    any_fail = False
-
-    # 3. Evaluate each claim
-    for claim in experiment["claims"]:
+    for claim in claims:
         metric = claim["metric"]
-        operator = claim["operator"]
-        expected = claim["value"]
-
-        actual = metrics.get(metric, None)
-        if actual is None:
-            status = "MISSING"
-            any_fail = True
-            actual_display = "N/A"
-        else:
-            if OPERATORS[operator](actual, expected):
-                status = "PASS"
-            else:
-                status = "FAIL"
-                any_fail = True
-            actual_display = actual
-
-        table.append([metric, expected, actual_display, status])
+        if claim.get("aggregate"):
+            metrics[claim_key(claim)] = aggregates[metric][claim["aggregate"]]
+        elif metric not in metrics and aggregates[metric]["last"] is not None:
+            metrics[metric] = aggregates[metric]["last"]
 
-    # 4. Format table
-    table_str = tabulate(table, headers=["Metric", "Expected", "Actual", "Status"], tablefmt="github")
-
-    # 5. Print table to console
-    print("\nClaim Evaluation Results:\n")
-    print(table_str)
+    return metrics
 
-    # 6. Save table to outputs/claim_report.txt
+def evaluate_claims(claims: List[dict], metrics: Optional[dict]) -> Tuple[List[list], bool]:
+    """
+    Evaluate `claims` against `metrics` (None when no metrics could be loaded).
+
+    Returns:
+        Table rows [metric, expected, actual, status] and whether any claim failed.
+    """
+    return ClaimPlan(claims).evaluate(metrics)
+
+def _table_lines(headers: List[str], rows: List[list]) -> Iterator[str]:
+    """Yield a GitHub-style table line by line; numeric columns are right-aligned."""
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [len(header) for header in headers]
+    numeric = [True] * len(headers)
+    for row, text in zip(rows, cells):
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(text[i]))
+            numeric[i] = numeric[i] and isinstance(value, (int, float))
+
+    def line(values: List[str]) -> str:
+        padded = (
+            value.rjust(width) if is_num else value.ljust(width)
+            for value, width, is_num in zip(values, widths, numeric)
+        )
+        return "| " + " | ".join(padded) + " |"
+
+    yield line(headers)
+    yield "|" + "|".join("-" * (width + 2) for width in widths) + "|"
+    for text in cells:
+        yield line(text)
+
+def check_claims(experiment: Optional[dict] = None) -> None:
+    # 1. Load + validate experiment.yaml (unless the caller already has it)
+    if experiment is None:
+        try:
+            experiment = load_experiment().data
+        except ExperimentValidationError as e:
+            raise ClaimCheckError(f"Experiment validation failed: {e}")
+
+    headers = ["Metric", "Expected", "Actual", "Status"]
+    cells = matrix_cells(experiment["procedure"])
+
+    if not cells:
+        # 2. Load metrics
+        metrics = load_metrics(claims=experiment["claims"])
+
+        # 3. Evaluate each claim
+        table, any_fail = evaluate_claims(experiment["claims"], metrics)
+    else:
+        # 2-3. Matrix run: cell-scoped claims against each cell's metrics,
+        #      aggregate-scoped claims against the summarised metrics
+        cell_claims = [c for c in experiment["claims"] if c.get("scope", "cell") == "cell"]
+        aggregate_claims = [c for c in experiment["claims"] if c.get("scope") == "aggregate"]
+
+        headers = ["Cell"] + headers
+        table = []
+        any_fail = False
+
+        # Each claim set is compiled once and reused for every cell
+        cell_plan = ClaimPlan(cell_claims)
+        scopes = [
+            (cell_id, cell_claims, cell_plan, Path("outputs") / CELLS_DIR / cell_id / "metrics.json")
+            for cell_id, _ in cells
+        ]
+        scopes.append(
+            ("aggregate", aggregate_claims, ClaimPlan(aggregate_claims), Path("outputs/metrics.json"))
+        )
+
+        for label, claims, plan, metrics_path in scopes:
+            if not claims:
+                continue
+            try:
+                metrics = load_metrics(metrics_path, claims)
+            except ClaimCheckError:
+                metrics = None
+            rows, failed = plan.evaluate(metrics)
+            table.extend([label] + row for row in rows)
+            any_fail = any_fail or failed
+
+    # 4. Stream the full table to .heda/reports/claim_report.txt
     report_dir = Path(".heda/reports")
     report_dir.mkdir(parents=True, exist_ok=True)
     report_path = report_dir / "claim_report.txt"
 
     with open(report_path, "w") as f:
         f.write("Claim Evaluation Results:\n\n")
-        f.write(table_str + "\n")
+        for line in _table_lines(headers, table):
+            f.write(line + "\n")
+
+    # 5. Print the table, or only the failing rows of a large one
+    status_col = len(headers) - 1
+    shown = table
+    if len(table) > CONSOLE_MAX_ROWS:
+        failing = [row for row in table if row[status_col] != "PASS"]
+        shown = failing[:CONSOLE_MAX_ROWS]
+
+    print("\nClaim Evaluation Results:\n")
+    if shown:
+        for line in _table_lines(headers, shown):
+            print(line)
+    if len(shown) < len(table):
+        failed = sum(1 for row in table if row[status_col] != "PASS")
+        print(f"\n{len(table)} claims: {len(table) - failed} passed, {failed} failed "
+              f"({len(shown)} shown)")
 
     print(f"\n✔ Claim report saved to {report_path.resolve()}")
 
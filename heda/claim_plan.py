@@ -0,0 +1,182 @@
+import operator as op
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from heda.utils.metric_stream import aggregate_key
+from heda.utils.stats import is_number
+
+_MISSING = object()
+
+COMPARATORS = {">=": op.ge, "<=": op.le, "==": op.eq}
+NUMPY_COMPARATORS = {">=": "greater_equal", "<=": "less_equal", "==": "equal"}
+
+# Below this many comparisons the NumPy conversion costs more than it saves.
+NUMPY_MIN_BATCH = 64
+
+
+@dataclass(slots=True)
+class CompiledClaim:
+    """A claim with its metric path split and element rule normalised."""
+    key: str
+    path: Tuple[str, ...]
+    operator: str
+    expected: float
+    elements: Optional[str] = None
+    min_fraction: float = 1.0
+
+
+def claim_key(claim: dict) -> str:
+    """The metrics key a claim is checked against."""
+    if claim.get("aggregate"):
+        return aggregate_key(claim["metric"], claim["aggregate"])
+    return claim["metric"]
+
+
+def compile_claim(claim: dict) -> CompiledClaim:
+    key = claim_key(claim)
+
+    elements = claim.get("elements")
+    min_fraction = 1.0
+    if isinstance(elements, dict):
+        min_fraction = elements["min_fraction"]
+        elements = "fraction"
+
+    return CompiledClaim(
+        key=key,
+        path=tuple(key.split(".")),
+        operator=claim["operator"],
+        expected=claim["value"],
+        elements=elements,
+        min_fraction=min_fraction,
+    )
+
+
+def resolve(metrics: Any, path: Tuple[str, ...]) -> Any:
+    """
+    Look up a dotted metric path. At every level the longest matching flat
+    key wins, so {"a.b": 1} and {"a": {"b": 1}} both resolve "a.b", and a
+    flat key takes precedence over the nested form.
+    """
+    if not path:
+        return metrics
+    if not isinstance(metrics, dict):
+        return _MISSING
+    for split in range(len(path), 0, -1):
+        key = ".".join(path[:split])
+        if key in metrics:
+            value = resolve(metrics[key], path[split:])
+            if value is not _MISSING:
+                return value
+    return _MISSING
+
+
+_np: Any = _MISSING
+
+
+def _numpy() -> Any:
+    """
+    NumPy, or None when it is not installed (pip install heda[fast]).
+    Imported on the first batch large enough to use it, not at startup.
+    """
+    global _np
+    if _np is _MISSING:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _np = numpy
+    return _np
+
+
+def _compare_batch(operator: str, actuals: List[float], expected: List[float]) -> List[bool]:
+    np = _numpy() if len(actuals) >= NUMPY_MIN_BATCH else None
+    if np is not None:
+        compare = getattr(np, NUMPY_COMPARATORS[operator])
+        return compare(np.asarray(actuals, dtype=float), np.asarray(expected, dtype=float)).tolist()
+    compare = COMPARATORS[operator]
+    return [compare(a, e) for a, e in zip(actuals, expected)]
+
+
+def _count_passing(operator: str, values: list, expected: float) -> int:
+    np = _numpy() if len(values) >= NUMPY_MIN_BATCH else None
+    if np is not None:
+        compare = getattr(np, NUMPY_COMPARATORS[operator])
+        return int(np.count_nonzero(compare(np.asarray(values, dtype=float), expected)))
+    compare = COMPARATORS[operator]
+    return sum(1 for v in values if compare(v, expected))
+
+
+class ClaimPlan:
+    """
+    Claims compiled once and evaluated against any number of metric sets.
+
+    Scalar claims are grouped by operator and compared in one batch (with
+    NumPy when installed). Claims with `elements` check an array metric:
+    "all"/"any" elements, or at least `min_fraction` of them, must satisfy
+    the comparison.
+    """
+
+    def __init__(self, claims: Sequence[dict]):
+        self.claims = [compile_claim(claim) for claim in claims]
+
+    def evaluate(self, metrics: Optional[dict]) -> Tuple[List[list], bool]:
+        """
+        Returns:
+            Table rows [metric, expected, actual, status] in claim order and
+            whether any claim failed.
+        """
+        rows: List[list] = [None] * len(self.claims)
+        batches: Dict[str, Tuple[List[int], List[float], List[float]]] = {}
+
+        for index, claim in enumerate(self.claims):
+            if metrics is None:
+                actual = _MISSING
+            else:
+                actual = metrics.get(claim.key, _MISSING)
+                if actual is _MISSING and len(claim.path) > 1:
+                    actual = resolve(metrics, claim.path)
+            if actual is _MISSING or actual is None:
+                rows[index] = [claim.key, claim.expected, "N/A", "MISSING"]
+            elif claim.elements is not None:
+                rows[index] = self._evaluate_elements(claim, actual)
+            elif is_number(actual):
+                indices, actuals, expected = batches.setdefault(claim.operator, ([], [], []))
+                indices.append(index)
+                actuals.append(actual)
+                expected.append(claim.expected)
+            else:
+                rows[index] = [claim.key, claim.expected, _display(actual), "INVALID"]
+
+        for operator, (indices, actuals, expected) in batches.items():
+            for index, actual, passed in zip(indices, actuals, _compare_batch(operator, actuals, expected)):
+                claim = self.claims[index]
+                rows[index] = [claim.key, claim.expected, actual, "PASS" if passed else "FAIL"]
+
+        any_fail = any(row[3] != "PASS" for row in rows)
+        return rows, any_fail
+
+    @staticmethod
+    def _evaluate_elements(claim: CompiledClaim, actual: Any) -> list:
+        if not isinstance(actual, list) or not all(is_number(v) for v in actual):
+            return [claim.key, claim.expected, _display(actual), "INVALID"]
+        if not actual:
+            return [claim.key, claim.expected, "[]", "MISSING"]
+
+        passing = _count_passing(claim.operator, actual, claim.expected)
+        total = len(actual)
+        if claim.elements == "all":
+            passed = passing == total
+        elif claim.elements == "any":
+            passed = passing > 0
+        else:
+            passed = passing / total >= claim.min_fraction
+
+        label = f"{claim.key} [{claim.elements}]"
+        if claim.elements == "fraction":
+            label = f"{claim.key} [fraction >= {claim.min_fraction}]"
+        return [label, claim.expected, f"{passing}/{total}", "PASS" if passed else "FAIL"]
+
+
+def _display(value: Any, limit: int = 40) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[: limit - 3] + "..."
@@ -1,25 +1,12 @@
-import shutil
-import time
-import requests
 import typer
 from pathlib import Path
-from heda.check import ClaimCheckError, check_claims
-from heda.utils.exp_utils import get_experiment_name
-from heda.utils.git_utils import git_init, git_remote_add
-from heda.utils.httputils import post_json
-from heda.init import create_directory_structure, create_template_files
-from heda.publish import PublishError, publish_experiment
-from heda.validate import load_experiment_yaml, validate_experiment, ExperimentValidationError
-from heda.run import run_experiment, ExperimentRunError
-from heda.finalize import finalize_experiment, ExperimentFinalizeError
-from heda.verify import VerificationError, verify_experiment
-from heda.config import load_config, onboard_user, save_config
-from heda.ui.progress import step
-from rich.console import Console
-import webbrowser 
-
-from dotenv import load_dotenv
-load_dotenv()
+from typing import TYPE_CHECKING, List, Optional
+
+# Subcommands import their modules (and requests, rich, jsonschema, yaml,
+# ...) when they run, so `heda --help` and light commands start fast.
+# benchmarks/startup.py keeps an eye on this.
+if TYPE_CHECKING:
+    from heda.validate import ExperimentContext
 
 # --- Auth0 Configuration ---
 AUTH0_DOMAIN = "dev-752bai1ktwy78hwp.us.auth0.com"
@@ -34,15 +21,33 @@ def main(ctx: typer.Context):
     """HEDA CLI."""
     if ctx.invoked_subcommand is None:
         typer.echo(ctx.get_help())
+        return
+
+    from heda.env import load_env
+    load_env()
 
+def load_experiment_context() -> "ExperimentContext":
+    """Load and validate experiment.yaml once for the whole command."""
+    from heda.validate import ExperimentValidationError, load_experiment
 
-console = Console()
+    try:
+        return load_experiment()
+    except ExperimentValidationError as e:
+        from heda.ui.progress import console
+        console.print(f"[red]Invalid experiment.yaml:[/] {e}")
+        raise typer.Exit(code=1)
 
 @app.command()
 def init(exp_name: str):
     """
     Initialize a new experiment directory.
     """
+    import shutil
+    from heda.init import create_directory_structure, create_template_files
+    from heda.ui.progress import console, step
+    from heda.utils.git_utils import git_init, git_remote_add
+    from heda.utils.httputils import post_json
+
     base_path = Path(exp_name)
     local_initialized = False
 
@@ -112,6 +117,9 @@ def validate():
     """
     Validate experiment.yaml against the schema.
     """
+    from heda.ui.progress import console, step
+    from heda.validate import ExperimentValidationError, load_experiment_yaml, validate_experiment
+
     experiment_path = Path("experiment.yaml")
 
     try:
@@ -141,6 +149,9 @@ def finalize():
     """
     Finalize the experiment by validating inputs and locking the Dockerfile.
     """
+    from heda.finalize import ExperimentFinalizeError, finalize_experiment
+    from heda.ui.progress import console, step
+
     try:
         with step(
             "Finalizing experiment",
@@ -158,13 +169,39 @@ def finalize():
         "[bold green]✓ Experiment finalized (Dockerfile locked)[/bold green]"
     )
    
+CPUS_OPTION = typer.Option(None, "--cpus", help="CPU limit for the experiment container.")
+MEMORY_OPTION = typer.Option(None, "--memory", help="Memory limit for the experiment container, e.g. 4g.")
+
 @app.command()
-def run():
+def run(
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Bypass the run cache and always build and run the container.",
+    ),
+    cpus: Optional[float] = CPUS_OPTION,
+    memory: Optional[str] = MEMORY_OPTION,
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Profile the entrypoint (py-spy if installed, else cProfile + tracemalloc) into .heda/profiles/.",
+    ),
+):
     """
     Run the experiment inside Docker.
     """
+    from heda.run import ExperimentRunError, run_experiment
+    from heda.ui.progress import console
+    from heda.utils.docker_utils import resource_args
+
+    experiment = load_experiment_context()
     try:
-        run_experiment()
+        run_experiment(
+            use_cache=not no_cache,
+            experiment=experiment.data,
+            run_args=resource_args(cpus, memory),
+            profile=profile,
+        )
     except ExperimentRunError as e:
         console.print(f"[red]Run failed:[/] {e}")
         raise typer.Exit(code=1)
@@ -176,8 +213,11 @@ def check():
     """
     Check experiment outputs against declared claims.
     """
+    from heda.check import ClaimCheckError, check_claims
+
+    experiment = load_experiment_context()
     try:
-        check_claims()
+        check_claims(experiment.data)
     except ClaimCheckError as e:
         typer.echo(f"Claim check failed:\n{e}", err=True)
         raise typer.Exit(code=1)
@@ -185,18 +225,109 @@ def check():
     typer.echo("All claims satisfied")
 
 @app.command()
-def verify():
+def verify(
+    rehash: bool = typer.Option(
+        False,
+        "--rehash",
+        help="Ignore the hash cache and rehash every input and output file.",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Bypass the run cache and always build and run the container.",
+    ),
+    cpus: Optional[float] = CPUS_OPTION,
+    memory: Optional[str] = MEMORY_OPTION,
+    replicas: int = typer.Option(
+        1,
+        "--replicas",
+        min=1,
+        help="Run this many identical containers concurrently to check determinism and aggregate metrics.",
+    ),
+    diff: Optional[List[Path]] = typer.Option(
+        None,
+        "--diff",
+        help=(
+            "Show files that differ from a verification file instead of running. "
+            "Pass once to compare against the working tree, twice to compare two files."
+        ),
+    ),
+):
     """
     Run experiment, evaluate claims, and produce verification.json.
     """
+    from heda.utils.docker_utils import resource_args
+    from heda.verify import VerificationError, diff_verification, verify_experiment
+
+    if diff:
+        if len(diff) > 2:
+            typer.echo("--diff accepts at most two verification files", err=True)
+            raise typer.Exit(code=2)
+        try:
+            changes = diff_verification(
+                diff[0],
+                diff[1] if len(diff) == 2 else None,
+                rehash=rehash,
+            )
+        except VerificationError as e:
+            typer.echo(f"Diff failed: {e}", err=True)
+            raise typer.Exit(code=1)
+        raise typer.Exit(code=1 if changes else 0)
+
+    experiment = load_experiment_context()
     try:
-        verify_experiment()
+        verify_experiment(
+            rehash=rehash,
+            experiment=experiment.data,
+            use_cache=not no_cache,
+            run_args=resource_args(cpus, memory),
+            replicas=replicas,
+        )
     except VerificationError as e:
         typer.echo(f"Verification failed: {e}", err=True)
         raise typer.Exit(code=1)
 
     typer.echo("Verification succeeded")
 
+@app.command("run-all")
+def run_all_command(
+    root: Path = typer.Argument(Path("."), help="Directory to search for experiment.yaml files."),
+    verify: bool = typer.Option(False, "--verify", help="Verify instead of run each experiment."),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", help="Experiments to run at once (default: CPU count)."),
+    cpus: Optional[float] = CPUS_OPTION,
+    memory: Optional[str] = MEMORY_OPTION,
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Bypass the run cache and always build and run the containers.",
+    ),
+):
+    """
+    Run or verify every experiment under a directory concurrently.
+    """
+    from heda.batch import BatchRunError, run_all
+    from heda.ui.progress import console
+
+    try:
+        results = run_all(
+            root,
+            verify=verify,
+            jobs=jobs,
+            cpus=cpus,
+            memory=memory,
+            use_cache=not no_cache,
+        )
+    except BatchRunError as e:
+        console.print(f"[red]Batch run failed:[/] {e}")
+        raise typer.Exit(code=1)
+
+    failed = [r for r in results if r["status"] != "PASS"]
+    if failed:
+        console.print(f"[red]{len(failed)} of {len(results)} experiments failed[/red]")
+        raise typer.Exit(code=1)
+
+    console.print(f"[bold green]✓ All {len(results)} experiments succeeded[/bold green]")
+
 @app.command("publish")
 def publish():
     """
@@ -207,9 +338,12 @@ def publish():
     - Update registry
     - Push to GitHub
     """
-    
+    from heda.publish import PublishError, publish_experiment
+
+
+    experiment = load_experiment_context()
     try:
-        exp_id = publish_experiment(exp_name=get_experiment_name())
+        exp_id = publish_experiment(experiment)
         typer.secho(f"Experiment published successfully! ID: {exp_id}", fg=typer.colors.GREEN)
     except PublishError as e:
         typer.secho(f"[❌] Publish failed: {e}", fg=typer.colors.RED)
@@ -219,6 +353,8 @@ def config():
     """
     One-time HEDA configuration and onboarding.
     """
+    from heda.config import onboard_user
+
     onboard_user()
     
 # @app.command("list")
@@ -243,6 +379,13 @@ def login():
     """
     Login via Auth0 GitHub OAuth (Device Flow)
     """
+    import time
+    import webbrowser
+
+    import requests
+    from heda.config import load_config, save_config
+    from heda.ui.progress import console
+
     console.print("[bold]HEDA Login via Auth0 GitHub OAuth[/bold]\n")
 
     # Request device code
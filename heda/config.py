@@ -1,26 +1,12 @@
-import json
-from pathlib import Path
 import typer
-from heda.utils.httputils import post_json, get_json
+from heda.utils.httputils import get_json, load_config, post_json, save_config
 from rich.console import Console
 
-CONFIG_DIR = Path.home() / ".config" / "heda"
-CONFIG_FILE = CONFIG_DIR / "config.json"
-
 class AuthError(BaseException):
     pass
 
 console = Console()
 
-def load_config() -> dict:
-    if CONFIG_FILE.exists():
-        return json.loads(CONFIG_FILE.read_text())
-    return {}
-
-def save_config(config: dict):
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    CONFIG_FILE.write_text(json.dumps(config, indent=2))
-
 def require_login():
     config = load_config()
     if not config.get("access_token"):
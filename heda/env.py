@@ -0,0 +1,10 @@
+_loaded = False
+
+def load_env() -> None:
+    """Load .env into the environment; later calls are no-ops."""
+    global _loaded
+    if _loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _loaded = True
@@ -1,10 +1,21 @@
 from pathlib import Path
 import hashlib
 import json
-from heda.ui.progress import step
+from heda.ui.progress import console, step
+from heda.utils.docker_utils import (
+    CONTEXT_DENY_LIST,
+    BuildContextError,
+    context_includes,
+    write_context_manifest,
+)
 from heda.utils.exp_utils import get_dockerfile_file_path, get_exp_path, get_requirement_file_path
-from heda.validate import load_experiment_yaml, validate_experiment
+from heda.validate import load_experiment
 from heda.templates.dockerfile_sample import dockerfile_template
+from heda.templates.dockerignore_template import (
+    DOCKERIGNORE_HEADER,
+    dockerignore_deny_template,
+    dockerignore_template,
+)
 
 class ExperimentFinalizeError(Exception):
     pass
@@ -21,8 +32,16 @@ def finalize_experiment() -> None:
     ):
         exp_path = get_exp_path()
         _ = get_requirement_file_path()
-        data = load_experiment_yaml(exp_path)
-        validate_experiment(data)
+        data = load_experiment(exp_path).data
+
+    # Refuse before writing anything rather than replace a hand-written file.
+    dockerignore = root / ".dockerignore"
+    if dockerignore.exists() and not dockerignore.read_text().startswith(DOCKERIGNORE_HEADER):
+        raise ExperimentFinalizeError(
+            ".dockerignore was not generated by heda and would be overwritten. "
+            "Move the paths the image needs to procedure.include in "
+            "experiment.yaml, then delete .dockerignore and finalize again."
+        )
 
     with step(
         "Generating Dockerfile",
@@ -39,6 +58,39 @@ def finalize_experiment() -> None:
         dockerfile_path = get_dockerfile_file_path()
         dockerfile_path.write_text(dockerfile_content)
 
+    with step(
+        "Writing build context manifest",
+        success_message="Build context manifest written",
+        failure_message="Failed to write build context manifest",
+    ):
+        try:
+            includes = context_includes(entrypoint, extra=data["procedure"].get("include"))
+        except BuildContextError as e:
+            raise ExperimentFinalizeError(str(e))
+        write_context_manifest(includes)
+
+        if includes is None:
+            dockerignore.write_text(
+                dockerignore_deny_template.format(excludes="\n".join(CONTEXT_DENY_LIST))
+            )
+        else:
+            include_lines = []
+            for include in includes:
+                include_lines.append(f"!{include}")
+                if (root / include).is_dir():
+                    include_lines.append(f"!{include}/**")
+
+            dockerignore.write_text(
+                dockerignore_template.format(includes="\n".join(include_lines))
+            )
+
+    if includes is None:
+        console.print(
+            "[yellow]Could not find the script or module the entrypoint runs; "
+            f"the build context includes everything except {', '.join(CONTEXT_DENY_LIST)}. "
+            "List what the image needs under procedure.include to send only that.[/yellow]"
+        )
+
     with step(
         "Locking Dockerfile digest",
         success_message="Dockerfile digest locked",
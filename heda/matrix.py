@@ -0,0 +1,71 @@
+import itertools
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from heda.utils.stats import write_summary_metrics
+
+# Each matrix cell writes to outputs/cells/<cell id>/ (mounted as its outputs/).
+CELLS_DIR = "cells"
+
+class MatrixError(Exception):
+    pass
+
+def expand_matrix(matrix) -> List[dict]:
+    """
+    Expand `procedure.matrix` into a list of parameter sets.
+
+    A mapping is a grid (parameter -> list of values, expanded as a cartesian
+    product in declaration order); a list is taken as explicit parameter sets.
+    """
+    if isinstance(matrix, dict):
+        keys = list(matrix)
+        return [
+            dict(zip(keys, values))
+            for values in itertools.product(*(matrix[k] for k in keys))
+        ]
+    return [dict(params) for params in matrix]
+
+def matrix_cells(procedure: dict) -> List[Tuple[str, dict]]:
+    """Return (cell id, parameters) for every cell, or [] without a matrix."""
+    matrix = procedure.get("matrix")
+    if not matrix:
+        return []
+    return [
+        (f"cell-{index:03d}", params)
+        for index, params in enumerate(expand_matrix(matrix))
+    ]
+
+def param_env(params: dict) -> Dict[str, str]:
+    """
+    Environment variables passing a cell's parameters to the container:
+    HEDA_PARAMS holds all of them as JSON, and each one is also exposed as
+    HEDA_PARAM_<NAME>.
+    """
+    env = {"HEDA_PARAMS": json.dumps(params, sort_keys=True)}
+    for name, value in params.items():
+        key = "HEDA_PARAM_" + re.sub(r"\W", "_", str(name)).upper()
+        env[key] = value if isinstance(value, str) else json.dumps(value)
+    return env
+
+def cell_command(entrypoint: str, params: dict) -> Optional[List[str]]:
+    """
+    Substitute `{name}` placeholders in the entrypoint with a cell's
+    parameters. Returns None when the entrypoint has no placeholders, so the
+    image's CMD is used as is.
+    """
+    if "{" not in entrypoint:
+        return None
+    try:
+        return entrypoint.format_map(params).split()
+    except (KeyError, IndexError, ValueError) as e:
+        raise MatrixError(f"Cannot substitute matrix parameters into entrypoint: {e}")
+
+def write_aggregate_metrics(cell_ids: List[str], outputs: Path = Path("outputs")) -> dict:
+    """
+    Summarise numeric metrics across cells into outputs/metrics.json as
+    "<metric>.<statistic>" keys (count, mean, std, min, max). Cells without
+    readable metrics are left out.
+    """
+    return write_summary_metrics([outputs / CELLS_DIR / cell_id for cell_id in cell_ids], outputs)
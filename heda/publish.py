@@ -2,20 +2,27 @@ import json
 import os
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, Optional
 import requests
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-
-from dotenv import load_dotenv
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    SpinnerColumn,
+    TextColumn,
+    TransferSpeedColumn,
+)
 
 from heda.utils.auth import get_username
 from heda.utils.exp_utils import get_dockerfile_file_path, get_exp_path, get_requirement_file_path
-from heda.utils.httputils import RequestError, post_multipart
-load_dotenv()
+from heda.utils.docker_utils import format_size
+from heda.utils.hash_utils import HashCache, hash_paths
+from heda.utils.httputils import RequestError, post_json, post_multipart
 
 
 # from heda.config import get_username
-from heda.validate import load_experiment_yaml, validate_experiment, ExperimentValidationError
+from heda.validate import ExperimentContext, ExperimentValidationError, load_experiment
 
 
 BACKEND_URL = os.environ.get("HEDA_BACKEND_URL")
@@ -47,6 +54,29 @@ def step(description: str):
             raise e
 
 
+@contextmanager
+def upload_progress(description: str):
+    """A byte progress bar; yields the (sent, total) callback that drives it."""
+    with Progress(
+        TextColumn(f"[green]{description}[/green]"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        transient=True,
+    ) as progress:
+        task = progress.add_task(description, total=None)
+
+        def on_progress(sent: int, total: int) -> None:
+            progress.update(task, completed=sent, total=total)
+
+        try:
+            yield on_progress
+        except Exception as e:
+            console.print(f"[red]✗ {description}[/red]")
+            raise e
+    console.print(f"[green]✓ {description}[/green]")
+
+
 def load_registry() -> dict:
     if not REGISTRY_FILE.exists():
         return {"versions": []}
@@ -57,31 +87,39 @@ def save_registry(registry: dict):
     REGISTRY_FILE.write_text(json.dumps(registry, indent=2))
 
 
-def publish_experiment(exp_name: str):
+def publish_experiment(experiment: Optional[ExperimentContext] = None):
 
-    with step("Validating experiment.yaml"):
-        experiment = load_experiment_yaml(Path("experiment.yaml"))
-        validate_experiment(experiment)
+    if experiment is None:
+        with step("Validating experiment.yaml"):
+            try:
+                experiment = load_experiment()
+            except ExperimentValidationError as e:
+                raise PublishError(f"Experiment validation failed: {e}")
+    exp_name = experiment.name
 
 
     with step("Collecting experiment files"):
         files = collect_publish_files()
 
-    with step("Creating pull request for publishing"):
-        try:
-            payload = post_multipart(
-        endpoint="/publish",
-        files=files,
-        form_data={
-            "experiment_name": exp_name
-        },
-        timeout=120
-    )
-        except RequestError as e:
+    with step("Hashing experiment files"):
+        manifest = build_publish_manifest(files)
+
+    try:
+        with step("Checking which files the backend already has"):
+            session = post_json(
+                "/publish/manifest",
+                {"experiment_name": exp_name, "files": manifest},
+            )
+    except RequestError as e:
+        if e.status_code != 404:
             raise PublishError(f"Publishing failed: {e}")
+        # Backend without deduplicated publishing: send everything
+        payload = publish_full(exp_name, files)
+    else:
+        payload = publish_missing(session, manifest)
 
-        experiment_id = payload["experiment_id"]
-        pr_url = payload["pr_url"]
+    experiment_id = payload["experiment_id"]
+    pr_url = payload["pr_url"]
 
 
     with step("Updating local registry"):
@@ -101,6 +139,77 @@ def publish_experiment(exp_name: str):
     return experiment_id, pr_url
 
 
+def build_publish_manifest(files: List[Path]) -> List[dict]:
+    """
+    Describe every file to publish by path, SHA-256 digest and size. Digests
+    come from the shared hash cache, so unchanged files are not re-read.
+    """
+    cache = HashCache.load()
+    try:
+        digests = hash_paths(files, Path("."), cache=cache)
+    finally:
+        cache.save()
+    manifest = []
+    for f in files:
+        rel_path = f.relative_to(Path(".")).as_posix()
+        manifest.append({"path": rel_path, "digest": digests[rel_path], "size": f.stat().st_size})
+    return manifest
+
+
+def publish_missing(session: dict, manifest: List[dict]) -> dict:
+    """
+    Upload only the blobs the backend reported missing, then commit the
+    publish session opened by /publish/manifest.
+    """
+    missing = set(session.get("missing", []))
+    blobs: Dict[str, Path] = {}
+    for entry in manifest:
+        if entry["digest"] in missing:
+            blobs.setdefault(entry["digest"], Path(entry["path"]))
+
+    if blobs:
+        size = sum(path.stat().st_size for path in blobs.values())
+        description = f"Uploading {len(blobs)} of {len(manifest)} files ({format_size(size)})"
+        with upload_progress(description) as on_progress:
+            try:
+                post_multipart(
+                    endpoint="/publish/blobs",
+                    files=list(blobs.values()),
+                    names=list(blobs.keys()),
+                    field="blobs",
+                    form_data={"upload_id": session["upload_id"]},
+                    on_progress=on_progress,
+                    # Blobs are content-addressed, so sending them twice is harmless.
+                    idempotency_key=f"{session['upload_id']}-blobs",
+                )
+            except RequestError as e:
+                raise PublishError(f"Publishing failed: {e}")
+    else:
+        console.print("[green]✓ Backend already has every file[/green]")
+
+    with step("Creating pull request for publishing"):
+        try:
+            return post_json("/publish/commit", {"upload_id": session["upload_id"]})
+        except RequestError as e:
+            raise PublishError(f"Publishing failed: {e}")
+
+
+def publish_full(exp_name: str, files: List[Path]) -> dict:
+    """Legacy publish: upload every file in a single request."""
+    with upload_progress("Uploading experiment files") as on_progress:
+        try:
+            return post_multipart(
+                endpoint="/publish",
+                files=files,
+                form_data={
+                    "experiment_name": exp_name
+                },
+                on_progress=on_progress,
+            )
+        except RequestError as e:
+            raise PublishError(f"Publishing failed: {e}")
+
+
 def collect_publish_files() -> list[Path]:
     root = Path(".") 
     files = [ get_exp_path(), get_requirement_file_path(), get_dockerfile_file_path()] 
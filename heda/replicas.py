@@ -0,0 +1,31 @@
+from pathlib import Path
+from typing import Dict, List
+
+from heda.utils.stats import write_summary_metrics
+
+# Each replica writes to outputs/replicas/<replica id>/.
+REPLICAS_DIR = "replicas"
+
+def replica_ids(count: int) -> List[str]:
+    """Return the id of every replica, or [] for a single plain run."""
+    if count <= 1:
+        return []
+    return [f"replica-{index:03d}" for index in range(count)]
+
+def replica_env(index: int) -> Dict[str, str]:
+    return {"HEDA_REPLICA_INDEX": str(index)}
+
+def write_replica_metrics(ids: List[str], outputs: Path = Path("outputs")) -> dict:
+    """
+    Aggregate numeric metrics across replicas into outputs/metrics.json.
+
+    Each metric gets "<metric>.<statistic>" keys (count, mean, std, min, max,
+    ci95_low, ci95_high), and the plain "<metric>" key holds the mean so
+    existing claims keep working. Replicas without readable metrics are left out.
+    """
+    return write_summary_metrics(
+        [outputs / REPLICAS_DIR / replica_id for replica_id in ids],
+        outputs,
+        with_ci=True,
+        mean_as_value=True,
+    )
@@ -1,69 +1,534 @@
-import subprocess
+import json
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence
 
 from heda.check import ClaimCheckError, check_claims
-from heda.ui.progress import step
+from heda.matrix import (
+    CELLS_DIR,
+    MatrixError,
+    cell_command,
+    matrix_cells,
+    param_env,
+    write_aggregate_metrics,
+)
+from heda.replicas import REPLICAS_DIR, replica_env, replica_ids, write_replica_metrics
+from heda.shards import SHARDS_DIR, ShardError, shard_env, shard_ids, write_reduced_metrics
+from heda.templates.profile_bootstrap import profile_bootstrap_template
+from heda.telemetry import ContainerSampler, report_profiles, write_profiles
+from heda.ui.progress import console, step
+from heda.watch import ClaimWatcher, stream_path
+from heda.utils import run_cache
+from heda.utils.docker_utils import (
+    DEFAULT_MOUNTS,
+    base_image,
+    build_command,
+    uses_build_cache,
+    fan_out_specs,
+    format_size,
+    reset_fan_out_outputs,
+    image_exists,
+    image_fingerprint,
+    image_tag,
+    list_context_files,
+    mount_args,
+    prune_images,
+    pull_image,
+)
+from heda.utils.hash_utils import HashCache, combine_digests, hash_tree
+from heda.utils.log_utils import LOGS_DIR, new_tail, stream_process
+from heda.utils.run_cache import run_cache_key
+from heda.utils.scheduler import SkipStage, Stage, run_stages
+from heda.validate import ExperimentValidationError, load_experiment
+
+DOCKERFILE = Path(".heda") / "Dockerfile"
+
+PROFILES_DIR = Path(".heda/profiles")
+PROFILE_MOUNT = "/heda/profile"
+PROFILE_BOOTSTRAP = "_heda_profile.py"
 
 class ExperimentRunError(Exception):
     pass
 
-def run_experiment() -> None:
-    heda_dir = Path(".heda")
-    dockerfile = heda_dir / "Dockerfile"
+class ClaimsFailedError(ExperimentRunError):
+    """The experiment ran, but its claims did not hold."""
+    pass
+
+class ClaimUnreachableError(ExperimentRunError):
+    """A container was stopped early because a claim could no longer be met."""
+    pass
 
+def load_finalized_experiment(experiment: Optional[dict] = None) -> dict:
+    """
+    Ensure the experiment is finalized and return its validated experiment.yaml.
+    """
     with step(
         "Checking experiment finalization state",
         success_message="Experiment is finalized",
         failure_message="Experiment not finalized",
     ):
-        if not dockerfile.exists():
+        if not DOCKERFILE.exists():
             raise ExperimentRunError(
                 "Experiment not finalized. Run `heda finalize` first."
             )
 
-    image_tag = "heda-experiment:latest"
+        if experiment is None:
+            try:
+                experiment = load_experiment().data
+            except ExperimentValidationError as e:
+                raise ExperimentRunError(f"Experiment validation failed: {e}")
 
-    with step(
-        "Building Docker image",
-        success_message="Docker image built successfully",
-        failure_message="Docker image build failed",
-    ):
-        build_cmd = [
-            "docker", "build",
-            "-f", str(dockerfile),
-            "-t", image_tag,
-            ".",
-        ]
+    return experiment
 
-        result = subprocess.run(build_cmd)
-        if result.returncode != 0:
-            raise ExperimentRunError("Docker build failed")
+def container_specs(procedure: dict, mounts: List[dict], replicas: int = 1) -> List[dict]:
+    """
+    Plan the containers of a run: one for a plain experiment, one per cell
+    of a parameter matrix, one per data shard, or `replicas` identical ones.
+    Fanned-out containers each get their own outputs directory and
+    environment (matrix parameters, SHARD_INDEX/SHARD_COUNT or
+    HEDA_REPLICA_INDEX).
+    """
+    cells = matrix_cells(procedure)
+    shards = shard_ids(procedure)
+    if cells and shards:
+        raise ExperimentRunError("procedure.matrix and procedure.shards cannot be combined")
 
-    with step(
-        "Running experiment container",
-        success_message="Experiment container executed",
-        failure_message="Experiment execution failed",
-    ):
+    replicas_ids = replica_ids(replicas)
+    if replicas_ids and (cells or shards):
+        raise ExperimentRunError("Replicas cannot be combined with procedure.matrix or procedure.shards")
+
+    if replicas_ids:
+        return fan_out_specs(mounts, REPLICAS_DIR, replicas_ids, replica_env)
+
+    if shards:
+        return fan_out_specs(
+            mounts, SHARDS_DIR, shards, lambda index: shard_env(index, len(shards))
+        )
+
+    if not cells:
+        return [{"id": "main", "env": {}, "mounts": mounts, "command": None, "params": None}]
+
+    cell_params = [params for _, params in cells]
+    try:
+        return fan_out_specs(
+            mounts,
+            CELLS_DIR,
+            [cell_id for cell_id, _ in cells],
+            lambda index: param_env(cell_params[index]),
+            command_fn=lambda index: cell_command(procedure["entrypoint"], cell_params[index]),
+            params=cell_params,
+        )
+    except MatrixError as e:
+        raise ExperimentRunError(str(e))
+
+def new_run_id() -> str:
+    """A sortable, unique id for one run, used to name containers and run artifacts."""
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(2)}"
+
+def run_containers(
+    tag: str,
+    specs: List[dict],
+    run_id: str,
+    run_args: Sequence[str] = (),
+    concurrency: Optional[int] = None,
+    profile: bool = False,
+    tail: Optional[Deque[str]] = None,
+    claims: Sequence[dict] = (),
+) -> Dict[str, dict]:
+    """
+    Run one container per spec from the same image, at most `concurrency`
+    at a time (default: CPU count), sampling each one's resource usage.
+
+    Container output goes to .heda/logs/<run_id>/<spec id>.log and, prefixed
+    with the spec id when there are several containers, into `tail`.
+
+    Claims with an `early_stop` rule in `claims` are watched against each
+    container's metrics stream (see heda.watch); a container whose claim
+    becomes unreachable is stopped and ClaimUnreachableError is raised.
+
+    With `profile`, each container's command is wrapped by a profiling
+    bootstrap that writes into .heda/profiles/<run_id>/<spec id>/; the image
+    and its Dockerfile are left untouched.
+
+    Returns:
+        Mapping of spec id -> resource profile.
+    """
+    profiles: Dict[str, dict] = {}
+    unreachable: Dict[str, str] = {}
+    # Early stop judges the latest value, so aggregate claims are not watched.
+    watched = [
+        claim for claim in claims
+        if claim.get("early_stop") and claim.get("aggregate", "last") == "last"
+    ]
+
+    def run_one(spec: dict) -> int:
+        docker_mounts = mount_args(spec["mounts"])
+        if spec["params"] is not None:
+            for mount in spec["mounts"]:
+                if not mount.get("read_only", False):
+                    params_path = Path(mount["source"]) / "params.json"
+                    params_path.write_text(json.dumps(spec["params"], indent=2))
+
+        env = dict(spec["env"])
+        command = list(spec["command"] or [])
+        profile_args: List[str] = []
+        if profile:
+            profile_dir = (PROFILES_DIR / run_id / spec["id"]).resolve()
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            (profile_dir / PROFILE_BOOTSTRAP).write_text(profile_bootstrap_template)
+            env["HEDA_PROFILE_DIR"] = PROFILE_MOUNT
+            profile_args = [
+                "--mount", f"type=bind,source={profile_dir},target={PROFILE_MOUNT}",
+                "--cap-add", "SYS_PTRACE",
+            ]
+            command = ["python", f"{PROFILE_MOUNT}/{PROFILE_BOOTSTRAP}", *command]
+
+        env_args = [arg for key, value in env.items() for arg in ("-e", f"{key}={value}")]
+        container_name = f"heda-{run_id}-{spec['id']}"
         run_cmd = [
             "docker", "run",
             "--rm",
-            "-v",
-            f"{Path.cwd()}:/exp",
-            image_tag,
+            "--name", container_name,
+            *docker_mounts,
+            *profile_args,
+            *env_args,
+            *run_args,
+            tag,
+            *command,
         ]
 
-        result = subprocess.run(run_cmd)
-        if result.returncode != 0:
-            raise ExperimentRunError("Experiment execution failed")
+        watcher = None
+        metrics_stream = stream_path(spec["mounts"])
+        if watched and metrics_stream is not None:
+            watcher = ClaimWatcher(container_name, metrics_stream, watched)
+            watcher.start()
 
-    with step(
-        "Validating experiment claims",
-        success_message="All experiment claims passed",
-        failure_message="Experiment claims validation failed",
-    ):
+        sampler = ContainerSampler(container_name)
+        sampler.start()
+        try:
+            return stream_process(
+                run_cmd,
+                LOGS_DIR / run_id / f"{spec['id']}.log",
+                tail,
+                prefix=f"[{spec['id']}] " if len(specs) > 1 else "",
+            )
+        finally:
+            profiles[spec["id"]] = sampler.stop()
+            if watcher is not None:
+                reason = watcher.stop()
+                if reason is not None:
+                    unreachable[spec["id"]] = reason
+
+    workers = min(len(specs), concurrency or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        returncodes = list(pool.map(run_one, specs))
+
+    if unreachable:
+        if len(specs) == 1:
+            raise ClaimUnreachableError(
+                f"Claim unreachable, run stopped early: {unreachable[specs[0]['id']]}"
+            )
+        raise ClaimUnreachableError(
+            "Claim unreachable, stopped early: "
+            + "; ".join(f"{spec_id}: {reason}" for spec_id, reason in unreachable.items())
+        )
+
+    failed = [spec["id"] for spec, code in zip(specs, returncodes) if code != 0]
+    log_dir = LOGS_DIR / run_id
+    if len(specs) == 1 and failed:
+        raise ExperimentRunError(f"Experiment execution failed (log: {log_dir / failed[0]}.log)")
+    if failed:
+        raise ExperimentRunError(
+            f"Experiment execution failed in: {', '.join(failed)} (logs: {log_dir})"
+        )
+
+    return profiles
+
+def pipeline_stages(
+    experiment: dict,
+    cache: HashCache,
+    use_cache: bool = True,
+    hash_inputs: bool = False,
+    run_args: Sequence[str] = (),
+    replicas: int = 1,
+    run_id: Optional[str] = None,
+    profile: bool = False,
+) -> List[Stage]:
+    """
+    Build the stages of an experiment run.
+
+    Fingerprinting, input hashing and the base-image pull are independent and
+    run concurrently; the build waits for them, the container (or one
+    container per matrix cell or data shard) waits for the build, and claims are checked
+    once the containers exit.
+
+    `run_args` are extra `docker run` arguments, e.g. resource limits, and
+    `replicas` runs that many identical containers from the one image.
+    Build and container output is streamed to .heda/logs/<run_id>/ and
+    container resource profiles are stored under .heda/telemetry/<run_id>/;
+    with `profile`, the entrypoint also runs under a profiler (see
+    run_containers). Claims with an `early_stop` rule stop the run as soon
+    as they become unreachable.
+
+    Stage results:
+        fingerprint: (image tag, build context files)
+        inputs: {input source: {relative path: digest}} for read-only mounts
+        cache: (run cache key, hit) when `use_cache`
+        claims: None if every claim passed, else the ClaimCheckError
+    """
+    run_id = run_id or new_run_id()
+    procedure = experiment["procedure"]
+    mounts = procedure.get("mounts", DEFAULT_MOUNTS)
+    inputs = [Path(m["source"]) for m in mounts if m.get("read_only", False)]
+    outputs = [Path(m["source"]) for m in mounts if not m.get("read_only", False)]
+    cells = matrix_cells(procedure)
+    shards = shard_ids(procedure)
+    replicas_ids = replica_ids(replicas)
+    build_tail = new_tail()
+    run_tail = new_tail()
+
+    # Early-stop rules are checked per container, which only matches the
+    # claims for plain runs and cell-scoped claims of matrix runs.
+    if shards or replicas_ids:
+        watched_claims = []
+    elif cells:
+        watched_claims = [c for c in experiment["claims"] if c.get("scope", "cell") == "cell"]
+    else:
+        watched_claims = experiment["claims"]
+
+    def cache_hit(results: Dict[str, Any]) -> bool:
+        return bool(results.get("cache") and results["cache"][1])
+
+    def fingerprint(results: Dict[str, Any]):
+        context_files = list_context_files()
+        fp = image_fingerprint(DOCKERFILE, context_files, cache=cache)
+        return image_tag(experiment["name"], fp), context_files
+
+    def hash_input_dirs(results: Dict[str, Any]):
+        return {source.as_posix(): hash_tree(source, cache=cache) for source in inputs}
+
+    def pull(results: Dict[str, Any]) -> None:
+        image = base_image(DOCKERFILE)
+        if image is None or image_exists(image):
+            raise SkipStage("base image present")
+        if not pull_image(image):
+            raise SkipStage("pull failed, the build will retry")
+
+    def check_cache(results: Dict[str, Any]):
+        tag, _ = results["fingerprint"]
+        input_hashes = {
+            source: combine_digests(digests)
+            for source, digests in results["inputs"].items()
+        }
+        run_procedure = {**procedure, "replicas": replicas} if replicas_ids else procedure
+        key = run_cache_key(tag, run_procedure, input_hashes)
+        hit = run_cache.lookup(key) is not None
+        if hit:
+            run_cache.restore(key, outputs)
+        return key, hit
+
+    def build(results: Dict[str, Any]) -> None:
+        if cache_hit(results):
+            raise SkipStage("cached run")
+
+        tag, context_files = results["fingerprint"]
+        if image_exists(tag):
+            raise SkipStage(f"image {tag} is up to date")
+
+        context_size = sum(f.stat().st_size for f in context_files)
+        console.print(
+            f"Build context: {len(context_files)} files, {format_size(context_size)}"
+        )
+
+        build_cmd = build_command(DOCKERFILE, tag)
+        if not uses_build_cache(build_cmd):
+            console.print(
+                "[yellow]Shared build cache skipped: it needs buildx with a builder that "
+                "can export a layer cache (set HEDA_BUILDX_BUILDER to a "
+                "docker-container builder).[/yellow]"
+            )
+        build_log = LOGS_DIR / run_id / "build.log"
+        returncode = stream_process(
+            build_cmd,
+            build_log,
+            build_tail,
+            env={**os.environ, "DOCKER_BUILDKIT": "1", "BUILDKIT_PROGRESS": "plain"},
+        )
+        if returncode != 0:
+            raise ExperimentRunError(f"Docker build failed (log: {build_log})")
+
+        removed = prune_images(tag)
+        if removed:
+            console.print(f"Removed {len(removed)} older image(s): {', '.join(removed)}")
+
+    def run(results: Dict[str, Any]) -> None:
+        if cache_hit(results):
+            raise SkipStage("outputs restored from run cache")
+
+        tag, _ = results["fingerprint"]
+        specs = container_specs(procedure, mounts, replicas)
+        reset_fan_out_outputs(mounts, [CELLS_DIR, SHARDS_DIR, REPLICAS_DIR])
+        run_cache.release(outputs)
+        if profile:
+            entrypoint = procedure["entrypoint"].split()
+            if not Path(entrypoint[0]).name.startswith("python"):
+                raise ExperimentRunError("--profile only supports Python entrypoints")
+            for spec in specs:
+                spec["command"] = spec["command"] or entrypoint
+
+        profiles = run_containers(
+            tag,
+            specs,
+            run_id,
+            run_args,
+            procedure.get("concurrency"),
+            profile=profile,
+            tail=run_tail,
+            claims=watched_claims,
+        )
+        if profile:
+            console.print(f"Profiles written to {(PROFILES_DIR / run_id).resolve()}")
+        write_profiles(run_id, profiles)
+        report_profiles(run_id, profiles)
+
+        if replicas_ids:
+            write_replica_metrics(replicas_ids)
+        elif cells:
+            write_aggregate_metrics([spec["id"] for spec in specs])
+        elif shards:
+            try:
+                write_reduced_metrics(shards, procedure.get("reducers", {}))
+            except ShardError as e:
+                raise ExperimentRunError(f"Failed to merge shard metrics: {e}")
+
+    def claims(results: Dict[str, Any]) -> Optional[ClaimCheckError]:
+        error = None
         try:
-            check_claims()
+            check_claims(experiment)
         except ClaimCheckError as e:
-            raise ExperimentRunError(
-                f"Experiment ran, but claims FAILED:\n{e}"
-            )
\ No newline at end of file
+            error = e
+
+        if use_cache and not cache_hit(results):
+            key, _ = results["cache"]
+            run_cache.store(key, outputs, {"claims_passed": error is None})
+
+        return error
+
+    build_deps = ["fingerprint", "pull"]
+    stages = [
+        Stage(
+            "fingerprint",
+            "Fingerprinting image inputs",
+            fingerprint,
+            success_message="Image inputs fingerprinted",
+            failure_message="Failed to fingerprint image inputs",
+        ),
+        Stage(
+            "pull",
+            "Pulling base image",
+            pull,
+            success_message="Base image pulled",
+            failure_message="Failed to pull base image",
+        ),
+    ]
+
+    if use_cache or hash_inputs:
+        stages.append(
+            Stage(
+                "inputs",
+                "Hashing experiment inputs",
+                hash_input_dirs,
+                success_message="Experiment inputs hashed",
+                failure_message="Failed to hash experiment inputs",
+            )
+        )
+
+    if use_cache:
+        stages.append(
+            Stage(
+                "cache",
+                "Checking run cache",
+                check_cache,
+                deps=("fingerprint", "inputs"),
+                success_message="Run cache checked",
+                failure_message="Failed to check run cache",
+            )
+        )
+        build_deps.append("cache")
+
+    stages += [
+        Stage(
+            "build",
+            "Building Docker image",
+            build,
+            deps=tuple(build_deps),
+            success_message="Docker image built successfully",
+            failure_message="Docker image build failed",
+            tail=build_tail,
+        ),
+        Stage(
+            "run",
+            "Running experiment container",
+            run,
+            deps=("build",),
+            success_message="Experiment container executed",
+            failure_message="Experiment execution failed",
+            tail=run_tail,
+        ),
+        Stage(
+            "claims",
+            "Validating experiment claims",
+            claims,
+            deps=("run",),
+            success_message="Experiment claims evaluated",
+            failure_message="Experiment claims validation failed",
+        ),
+    ]
+    return stages
+
+def run_experiment(
+    use_cache: bool = True,
+    experiment: Optional[dict] = None,
+    cache: Optional[HashCache] = None,
+    run_args: Sequence[str] = (),
+    profile: bool = False,
+) -> None:
+    """
+    Build (if needed) and run the experiment container, then check claims.
+
+    Args:
+        use_cache: Reuse a cached run with identical image, procedure and inputs
+        experiment: Already loaded and validated experiment.yaml, if any
+        cache: Shared file digest cache; loaded from disk when omitted
+        run_args: Extra `docker run` arguments, e.g. resource limits
+        profile: Profile the entrypoint into .heda/profiles/<run>/; always
+            runs the container, so the run cache is bypassed
+    """
+    experiment = load_finalized_experiment(experiment)
+    if cache is None:
+        cache = HashCache.load()
+
+    try:
+        results = run_stages(
+            pipeline_stages(
+                experiment,
+                cache,
+                use_cache=use_cache and not profile,
+                run_args=run_args,
+                profile=profile,
+            )
+        )
+    finally:
+        cache.save()
+
+    raise_for_claims(results)
+
+def raise_for_claims(results: Dict[str, Any]) -> None:
+    """Raise ClaimsFailedError if the pipeline's claim check failed."""
+    if results["claims"] is not None:
+        raise ClaimsFailedError(
+            f"Experiment ran, but claims FAILED:\n{results['claims']}"
+        )
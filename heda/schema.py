@@ -15,6 +15,88 @@ EXPERIMENT_SCHEMA = {
                 "entrypoint": {
                     "type": "string",
                     "minLength": 1
+                },
+                "matrix": {
+                    "oneOf": [
+                        {
+                            "type": "object",
+                            "minProperties": 1,
+                            "additionalProperties": {
+                                "type": "array",
+                                "minItems": 1
+                            }
+                        },
+                        {
+                            "type": "array",
+                            "minItems": 1,
+                            "items": {
+                                "type": "object",
+                                "minProperties": 1
+                            }
+                        }
+                    ]
+                },
+                "shards": {
+                    "type": "integer",
+                    "minimum": 1
+                },
+                "reducers": {
+                    "type": "object",
+                    "additionalProperties": {
+                        "oneOf": [
+                            {
+                                "type": "string",
+                                "enum": ["sum", "mean", "weighted_mean", "min", "max", "concat"]
+                            },
+                            {
+                                "type": "object",
+                                "required": ["reducer"],
+                                "additionalProperties": False,
+                                "properties": {
+                                    "reducer": {
+                                        "type": "string",
+                                        "enum": ["sum", "mean", "weighted_mean", "min", "max", "concat"]
+                                    },
+                                    "weight": {
+                                        "type": "string",
+                                        "minLength": 1
+                                    }
+                                }
+                            }
+                        ]
+                    }
+                },
+                "concurrency": {
+                    "type": "integer",
+                    "minimum": 1
+                },
+                "include": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "minLength": 1
+                    }
+                },
+                "mounts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["source", "target"],
+                        "additionalProperties": False,
+                        "properties": {
+                            "source": {
+                                "type": "string",
+                                "minLength": 1
+                            },
+                            "target": {
+                                "type": "string",
+                                "pattern": "^/"
+                            },
+                            "read_only": {
+                                "type": "boolean"
+                            }
+                        }
+                    }
                 }
             }
         },
@@ -36,6 +118,49 @@ EXPERIMENT_SCHEMA = {
                     },
                     "value": {
                         "type": "number"
+                    },
+                    "elements": {
+                        "oneOf": [
+                            {
+                                "type": "string",
+                                "enum": ["all", "any"]
+                            },
+                            {
+                                "type": "object",
+                                "required": ["min_fraction"],
+                                "additionalProperties": False,
+                                "properties": {
+                                    "min_fraction": {
+                                        "type": "number",
+                                        "minimum": 0,
+                                        "maximum": 1
+                                    }
+                                }
+                            }
+                        ]
+                    },
+                    "aggregate": {
+                        "type": "string",
+                        "enum": ["count", "first", "last", "min", "max", "sum", "mean", "p50", "p90", "p95", "p99"]
+                    },
+                    "scope": {
+                        "type": "string",
+                        "enum": ["cell", "aggregate"]
+                    },
+                    "early_stop": {
+                        "type": "object",
+                        "minProperties": 1,
+                        "additionalProperties": False,
+                        "properties": {
+                            "deadline": {
+                                "type": "number",
+                                "exclusiveMinimum": 0
+                            },
+                            "monotone": {
+                                "type": "string",
+                                "enum": ["increasing", "decreasing"]
+                            }
+                        }
                     }
                 }
             }
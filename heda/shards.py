@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from typing import Dict, List
+
+from heda.utils.stats import is_number
+
+# Each shard writes partial metrics to outputs/shards/<shard id>/.
+SHARDS_DIR = "shards"
+
+REDUCERS = ("sum", "mean", "weighted_mean", "min", "max", "concat")
+
+class ShardError(Exception):
+    pass
+
+def shard_ids(procedure: dict) -> List[str]:
+    """Return the id of every shard, or [] when the procedure is not sharded."""
+    count = procedure.get("shards", 1)
+    if count <= 1:
+        return []
+    return [f"shard-{index:03d}" for index in range(count)]
+
+def shard_env(index: int, count: int) -> Dict[str, str]:
+    return {"SHARD_INDEX": str(index), "SHARD_COUNT": str(count)}
+
+def _reduce(name: str, spec, partials: List[dict]):
+    reducer = spec if isinstance(spec, str) else spec["reducer"]
+    present = [m for m in partials if name in m]
+    if not present:
+        return None
+    values = [m[name] for m in present]
+
+    if reducer == "concat":
+        merged = []
+        for value in values:
+            merged.extend(value if isinstance(value, list) else [value])
+        return merged
+
+    if not all(is_number(v) for v in values):
+        raise ShardError(f"Reducer '{reducer}' needs numeric values for metric '{name}'")
+
+    if reducer == "sum":
+        return sum(values)
+    if reducer == "mean":
+        return sum(values) / len(values)
+    if reducer == "min":
+        return min(values)
+    if reducer == "max":
+        return max(values)
+
+    # weighted_mean
+    weight = spec.get("weight") if isinstance(spec, dict) else None
+    if not weight:
+        raise ShardError(f"weighted_mean for metric '{name}' needs a 'weight' metric")
+    weights = [m.get(weight) for m in present]
+    if not all(is_number(w) for w in weights):
+        raise ShardError(f"Weight metric '{weight}' missing or not numeric in some shards")
+    total = sum(weights)
+    if total == 0:
+        raise ShardError(f"Weight metric '{weight}' sums to zero")
+    return sum(v * w for v, w in zip(values, weights)) / total
+
+def reduce_metrics(partials: List[dict], reducers: Dict[str, object]) -> dict:
+    """
+    Merge per-shard metrics with the declared reducers. Metrics without a
+    reducer are not carried into the merged result.
+    """
+    merged = {}
+    for name, spec in reducers.items():
+        value = _reduce(name, spec, partials)
+        if value is not None:
+            merged[name] = value
+    return merged
+
+def write_reduced_metrics(
+    ids: List[str],
+    reducers: Dict[str, object],
+    outputs: Path = Path("outputs"),
+) -> dict:
+    """
+    Read every shard's metrics.json, reduce them, and write the result to
+    outputs/metrics.json for the claim check.
+    """
+    partials = []
+    for shard_id in ids:
+        metrics_path = outputs / SHARDS_DIR / shard_id / "metrics.json"
+        try:
+            metrics = json.loads(metrics_path.read_text())
+        except (OSError, ValueError) as e:
+            raise ShardError(f"Cannot read partial metrics of {shard_id}: {e}")
+        if not isinstance(metrics, dict):
+            raise ShardError(f"Partial metrics of {shard_id} must be a JSON object")
+        partials.append(metrics)
+
+    merged = reduce_metrics(partials, reducers)
+    outputs.mkdir(parents=True, exist_ok=True)
+    (outputs / "metrics.json").write_text(json.dumps(merged, indent=2))
+    return merged
@@ -0,0 +1,161 @@
+import json
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tabulate import tabulate
+
+from heda.utils.docker_utils import format_size
+
+TELEMETRY_DIR = Path(".heda/telemetry")
+SAMPLE_INTERVAL = 1.0
+
+_SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+def parse_size(text: str) -> int:
+    """Parse a Docker size string such as '12.5MiB' or '1.2kB' into bytes."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", text)
+    if not match:
+        return 0
+    value, unit = match.groups()
+    return int(float(value) * _SIZE_UNITS.get(unit.lower() or "b", 1))
+
+def _parse_pair(text: str) -> List[int]:
+    return [parse_size(part) for part in text.split("/")]
+
+def sample_container(name: str) -> Optional[dict]:
+    """
+    Take one resource sample of a running container via `docker stats`.
+    Returns None if the container is not (or no longer) running.
+    """
+    result = subprocess.run(
+        ["docker", "stats", "--no-stream", "--format", "{{json .}}", name],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+
+    try:
+        stats = json.loads(result.stdout.strip().splitlines()[0])
+        mem_used, mem_limit = _parse_pair(stats["MemUsage"])
+        block_read, block_write = _parse_pair(stats["BlockIO"])
+        net_rx, net_tx = _parse_pair(stats["NetIO"])
+        return {
+            "cpu_percent": float(stats["CPUPerc"].rstrip("%") or 0),
+            "mem_bytes": mem_used,
+            "mem_limit_bytes": mem_limit,
+            "block_read_bytes": block_read,
+            "block_write_bytes": block_write,
+            "net_rx_bytes": net_rx,
+            "net_tx_bytes": net_tx,
+            "pids": int(stats.get("PIDs") or 0),
+        }
+    except (KeyError, ValueError, IndexError):
+        return None
+
+class ContainerSampler:
+    """
+    Samples a container's resource usage on a background thread for as long
+    as it runs, building a time series and its peaks.
+    """
+
+    def __init__(self, container_name: str, interval: float = SAMPLE_INTERVAL):
+        self.container_name = container_name
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            sample = sample_container(self.container_name)
+            if sample is not None:
+                sample["t"] = round(time.monotonic() - self._started, 3)
+                self.samples.append(sample)
+            self._stop.wait(self.interval)
+
+    def stop(self) -> dict:
+        """Stop sampling and return the container's resource profile."""
+        wall_time = time.monotonic() - self._started
+        self._stop.set()
+        self._thread.join()
+        return build_profile(self.samples, wall_time)
+
+def build_profile(samples: List[dict], wall_time: float) -> dict:
+    """
+    Summarise a sample series: wall time, CPU seconds (CPU% integrated over
+    time), peak CPU and memory, and I/O totals from the last sample.
+    """
+    cpu_seconds = 0.0
+    previous_t = 0.0
+    for sample in samples:
+        cpu_seconds += sample["cpu_percent"] / 100 * (sample["t"] - previous_t)
+        previous_t = sample["t"]
+
+    last = samples[-1] if samples else {}
+    return {
+        "wall_time_s": round(wall_time, 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "peak_cpu_percent": max((s["cpu_percent"] for s in samples), default=0.0),
+        "peak_mem_bytes": max((s["mem_bytes"] for s in samples), default=0),
+        "block_read_bytes": last.get("block_read_bytes", 0),
+        "block_write_bytes": last.get("block_write_bytes", 0),
+        "net_rx_bytes": last.get("net_rx_bytes", 0),
+        "net_tx_bytes": last.get("net_tx_bytes", 0),
+        "samples": samples,
+    }
+
+def write_profiles(run_id: str, profiles: Dict[str, dict]) -> Path:
+    """Store every container's profile under .heda/telemetry/<run id>/."""
+    run_dir = TELEMETRY_DIR / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    for container_id, profile in profiles.items():
+        (run_dir / f"{container_id}.json").write_text(json.dumps(profile, indent=2))
+
+    summary = {
+        container_id: {k: v for k, v in profile.items() if k != "samples"}
+        for container_id, profile in profiles.items()
+    }
+    (run_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return run_dir
+
+def report_profiles(run_id: str, profiles: Dict[str, dict]) -> None:
+    """Print a resource summary and save it next to the claim report."""
+    table = [
+        [
+            container_id,
+            f"{p['wall_time_s']:.1f}s",
+            f"{p['cpu_seconds']:.1f}s",
+            f"{p['peak_cpu_percent']:.0f}%",
+            format_size(p["peak_mem_bytes"]),
+            f"{format_size(p['block_read_bytes'])} / {format_size(p['block_write_bytes'])}",
+        ]
+        for container_id, p in profiles.items()
+    ]
+    table_str = tabulate(
+        table,
+        headers=["Container", "Wall", "CPU time", "Peak CPU", "Peak memory", "Block I/O (r/w)"],
+        tablefmt="github",
+    )
+
+    print("\nResource Usage:\n")
+    print(table_str)
+
+    report_dir = Path(".heda/reports")
+    report_dir.mkdir(parents=True, exist_ok=True)
+    with open(report_dir / "resource_report.txt", "w") as f:
+        f.write(f"Resource Usage (run {run_id}):\n\n")
+        f.write(table_str + "\n")
@@ -3,8 +3,9 @@ FROM python:3.11-slim
 
 WORKDIR /exp
 COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
+RUN --mount=type=cache,target=/root/.cache/pip \\
+    pip install -r requirements.txt
 
 COPY . .
 CMD {entrypoint}
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,21 @@
+# First line of every .dockerignore heda writes; files without it are
+# hand-written and left alone.
+DOCKERIGNORE_HEADER = "# Generated by `heda finalize`."
+
+dockerignore_template = """\
+# Generated by `heda finalize`. Everything is excluded from the Docker
+# build context except the paths the entrypoint needs and those listed
+# under procedure.include in experiment.yaml.
+*
+{includes}
+**/__pycache__
+"""
+
+dockerignore_deny_template = """\
+# Generated by `heda finalize`. The entrypoint's script or module could not
+# be resolved, so only HEDA state, VCS metadata and runtime mounts are
+# excluded from the Docker build context. List the paths the image needs
+# under procedure.include in experiment.yaml to build from an allow-list.
+{excludes}
+**/__pycache__
+"""
@@ -2,8 +2,29 @@ experiment_yaml_template = """\
 name: {exp_name}
 procedure:
   entrypoint: python src/main.py
+  # Extra paths baked into the image besides requirements.txt, src/ and the
+  # entrypoint script, e.g. top-level modules or config the code reads.
+  # include:
+  #   - configs
+  # Runtime mounts (defaults shown). Source code is baked into the image.
+  # mounts:
+  #   - source: data
+  #     target: /exp/data
+  #     read_only: true
+  #   - source: outputs
+  #     target: /exp/outputs
+  #     read_only: false
 claims:
   - metric: accuracy
     operator: ">="
     value: 0.8
-"""
\ No newline at end of file
+    # For per-step metrics streamed to outputs/metrics.jsonl, check an
+    # aggregate over the stream: count, first, last, min, max, sum, mean,
+    # p50, p90, p95 or p99.
+    # aggregate: last
+    # Stop the run early once the claim cannot be met. Requires the
+    # experiment to append metrics to outputs/metrics.jsonl as it runs.
+    # early_stop:
+    #   deadline: 3600        # seconds
+    #   monotone: increasing  # or decreasing
+"""
@@ -0,0 +1,125 @@
+profile_bootstrap_template = '''\
+"""
+Profiling wrapper for an experiment entrypoint.
+
+Generated by `heda run --profile`. Runs the entrypoint under py-spy when it
+is installed in the image, otherwise under cProfile and tracemalloc, and
+writes its results to HEDA_PROFILE_DIR.
+"""
+
+import cProfile
+import os
+import pstats
+import runpy
+import shutil
+import subprocess
+import sys
+import tracemalloc
+
+OUT_DIR = os.environ.get("HEDA_PROFILE_DIR", "/heda/profile")
+MAX_DEPTH = 128
+
+
+def label(func):
+    filename, line, name = func
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def write_collapsed(stats, path):
+    """
+    Write collapsed stacks ("a;b;c <microseconds>") reconstructed from the
+    cProfile call graph, apportioning each function's time to its callers.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge))
+
+    lines = {}
+
+    def walk(func, stack, on_stack, scale):
+        _, _, tottime, cumtime, _ = entries[func]
+        self_us = int(tottime * scale * 1e6)
+        if self_us > 0:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0) + self_us
+        if len(stack) >= MAX_DEPTH:
+            return
+        for child, edge in callees.get(func, []):
+            child_cumtime = entries[child][3]
+            if child in on_stack or child_cumtime <= 0:
+                continue
+            child_scale = scale * edge[3] / child_cumtime
+            if child_scale * child_cumtime < 1e-6:
+                continue
+            walk(child, stack + [label(child)], on_stack | {child}, child_scale)
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(func, [label(func)], {func}, 1.0)
+
+    with open(path, "w") as f:
+        for stack, micros in sorted(lines.items()):
+            f.write(f"{stack} {micros}\\n")
+
+
+def write_memory(snapshot, peak, path, limit=25):
+    with open(path, "w") as f:
+        f.write(f"Peak traced memory: {peak} bytes\\n\\n")
+        f.write(f"Top {limit} allocation sites at exit:\\n")
+        for stat in snapshot.statistics("lineno")[:limit]:
+            f.write(f"{stat}\\n")
+
+
+def main():
+    argv = sys.argv[1:]
+    if argv and os.path.basename(argv[0]).startswith("python"):
+        argv = argv[1:]
+    if not argv:
+        sys.exit("heda profile: empty entrypoint")
+
+    py_spy = shutil.which("py-spy")
+    if py_spy:
+        sys.exit(subprocess.call([
+            py_spy, "record",
+            "--format", "raw",
+            "--output", os.path.join(OUT_DIR, "profile.collapsed"),
+            "--", sys.executable, *argv,
+        ]))
+
+    module = None
+    if argv[0] == "-m":
+        module = argv[1]
+        sys.argv = [module, *argv[2:]]
+    else:
+        sys.argv = argv
+        sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+
+    exit_code = 0
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        if module:
+            runpy.run_module(module, run_name="__main__", alter_sys=True)
+        else:
+            runpy.run_path(argv[0], run_name="__main__")
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(os.path.join(OUT_DIR, "profile.pstats"))
+        write_collapsed(pstats.Stats(profiler), os.path.join(OUT_DIR, "profile.collapsed"))
+        write_memory(snapshot, peak, os.path.join(OUT_DIR, "memory.txt"))
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
+'''
@@ -1,6 +1,6 @@
 from contextlib import contextmanager
-from typing import Optional
-from rich.console import Console
+from typing import Dict, Iterable, Optional
+from rich.console import Console, Group
 from rich.live import Live
 from rich.spinner import Spinner
 from rich.text import Text
@@ -11,6 +11,9 @@ console = Console()
 SUCCESS_STYLE = Style(color="green", bold=True)
 FAILURE_STYLE = Style(color="red", bold=True)
 INFO_STYLE = Style(color="cyan")
+PENDING_STYLE = Style(color="bright_black")
+SKIPPED_STYLE = Style(color="yellow")
+TAIL_STYLE = Style(color="bright_black")
 
 
 @contextmanager
@@ -62,3 +65,88 @@ def step(
                 f"✓ {success_message or description}",
                 style=SUCCESS_STYLE,
             )
+
+
+class StepBoard:
+    """
+    Live view of several steps that may run concurrently, one line per step.
+
+    Steps start out pending, show a spinner while running, and end as
+    succeeded, failed or skipped. A running step can show the tail of its
+    output (any live, bounded sequence of lines) beneath its spinner.
+    """
+
+    def __init__(self, spinner_name: str = "dots"):
+        self.spinner_name = spinner_name
+        self._descriptions: Dict[str, str] = {}
+        self._rows: Dict[str, object] = {}
+        self._tails: Dict[str, Iterable[str]] = {}
+
+    def add(self, key: str, description: str) -> None:
+        self._descriptions[key] = description
+        self._rows[key] = Text(f"○ {description}", style=PENDING_STYLE)
+
+    def start(self, key: str, tail: Optional[Iterable[str]] = None) -> None:
+        self._rows[key] = Spinner(
+            self.spinner_name,
+            text=Text(self._descriptions[key], style=INFO_STYLE),
+        )
+        if tail is not None:
+            self._tails[key] = tail
+
+    def _finish(self, key: str, text: Text) -> None:
+        self._tails.pop(key, None)
+        self._rows[key] = text
+
+    def succeed(self, key: str, message: Optional[str] = None) -> None:
+        self._finish(key, Text(
+            f"✓ {message or self._descriptions[key]}",
+            style=SUCCESS_STYLE,
+        ))
+
+    def fail(self, key: str, message: Optional[str] = None) -> None:
+        self._finish(key, Text(
+            f"✗ {message or self._descriptions[key]}",
+            style=FAILURE_STYLE,
+        ))
+
+    def skip(self, key: str, reason: Optional[str] = None) -> None:
+        text = f"– {self._descriptions[key]}"
+        if reason:
+            text += f" (skipped: {reason})"
+        self._finish(key, Text(text, style=SKIPPED_STYLE))
+
+    def __rich__(self) -> Group:
+        renderables = []
+        for key, row in list(self._rows.items()):
+            renderables.append(row)
+            tail = self._tails.get(key)
+            if tail:
+                lines = list(tail)
+                renderables.append(
+                    Text("\n".join(f"    {line}" for line in lines), style=TAIL_STYLE, no_wrap=True, overflow="ellipsis")
+                )
+        return Group(*renderables)
+
+
+@contextmanager
+def parallel_steps(
+    *,
+    spinner_name: str = "dots",
+    console_instance: Console = console,
+    refresh_rate: int = 12,
+):
+    """
+    Context-managed live board for steps that run concurrently.
+
+    Yields a StepBoard; callers register steps with `add` and move them
+    through `start`, `succeed`, `fail` and `skip`.
+    """
+    board = StepBoard(spinner_name)
+
+    with Live(
+        board,
+        console=console_instance,
+        refresh_per_second=refresh_rate,
+    ):
+        yield board
@@ -0,0 +1,451 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from heda.utils.hash_utils import HASH_ALGORITHM, HashCache, hash_file, hash_paths
+
+# Local BuildKit cache shared by every experiment on this host/runner.
+BUILD_CACHE_DIR = Path(
+    os.environ.get("HEDA_BUILD_CACHE_DIR", Path.home() / ".cache" / "heda" / "buildkit")
+)
+
+# Optional buildx builder to use; cache export needs a non-"docker" driver.
+BUILDX_BUILDER = os.environ.get("HEDA_BUILDX_BUILDER")
+
+# docker-container builder heda creates (once per host) when no builder is
+# configured and the default one uses the "docker" driver.
+HEDA_BUILDER = "heda"
+
+# Every source change builds a new heda-<name>:<fingerprint> image; only the
+# most recent ones per experiment are kept.
+IMAGE_KEEP = 3
+
+CONTEXT_MANIFEST_FILE = Path(".heda/context.json")
+
+# What the image needs when no context manifest has been written yet.
+DEFAULT_CONTEXT_INCLUDES = ["requirements.txt", "src"]
+
+# Entrypoint arguments under these paths are never baked into the image:
+# they are HEDA state, VCS metadata, or mounted into the container at runtime.
+CONTEXT_NEVER_INCLUDE = {".git", ".heda", "data", "outputs"}
+
+# What the deny-list fallback keeps out of the build context: the above plus
+# files HEDA writes next to experiment.yaml, which change on every verify and
+# would otherwise change the image fingerprint. Both the generated
+# .dockerignore and the fingerprint's file list come from this one list.
+CONTEXT_DENY_LIST = sorted(CONTEXT_NEVER_INCLUDE | {".dockerignore", "verification.json"})
+
+# Directory names skipped inside included paths.
+CONTEXT_SKIP_NAMES = {"__pycache__"}
+
+
+class BuildContextError(Exception):
+    pass
+
+
+def _module_path(module: str, root: Path) -> Optional[Path]:
+    """The top-level file or package `python -m module` runs from, if any."""
+    parts = module.split(".")
+    for base in (Path("."), Path("src")):
+        target = root / base.joinpath(*parts)
+        if target.with_suffix(".py").is_file() or target.is_dir():
+            top = base / parts[0]
+            return top if (root / top).is_dir() else top.with_suffix(".py")
+    return None
+
+
+def _add_include(includes: List[str], candidate: Path) -> None:
+    """Add `candidate` unless it or one of its parent directories is already included."""
+    covered = {candidate, *candidate.parents}
+    if any(Path(inc) in covered for inc in includes):
+        return
+    includes.append(candidate.as_posix())
+
+
+def context_includes(
+    entrypoint: str,
+    root: Path = Path("."),
+    extra: Optional[List[str]] = None,
+) -> Optional[List[str]]:
+    """
+    Work out which paths the image needs for `entrypoint`: requirements.txt,
+    src/, the script or `-m` module the entrypoint runs, any other file it
+    names directly, and the `extra` paths listed under procedure.include.
+
+    Returns None when the entrypoint's script or module cannot be found and
+    no `extra` paths are given; the build context then falls back to
+    excluding only CONTEXT_NEVER_INCLUDE.
+    """
+    includes = list(DEFAULT_CONTEXT_INCLUDES)
+    resolved = False
+
+    tokens = entrypoint.split()
+    for index, token in enumerate(tokens):
+        if token == "-m" and index + 1 < len(tokens):
+            module = _module_path(tokens[index + 1], root)
+            if module is not None:
+                resolved = True
+                _add_include(includes, module)
+            continue
+
+        candidate = Path(token)
+        if candidate.is_absolute() or ".." in candidate.parts:
+            continue
+        if not (root / candidate).is_file():
+            continue
+        if candidate.suffix == ".py":
+            resolved = True
+        if candidate.parts[0] in CONTEXT_NEVER_INCLUDE:
+            continue
+        _add_include(includes, candidate)
+
+    for include in extra or []:
+        candidate = Path(include)
+        if candidate.is_absolute() or ".." in candidate.parts or not candidate.parts:
+            raise BuildContextError(f"procedure.include: {include!r} must be a path inside the experiment")
+        if not (root / candidate).exists():
+            raise BuildContextError(f"procedure.include: {include!r} not found")
+        if candidate.as_posix() not in includes:
+            includes.append(candidate.as_posix())
+
+    if not resolved and not extra:
+        return None
+    return includes
+
+
+def write_context_manifest(includes: Optional[List[str]], path: Path = CONTEXT_MANIFEST_FILE) -> None:
+    """Record the allow-list, or the deny-list fallback when `includes` is None."""
+    manifest = {"include": includes} if includes is not None else {"exclude": CONTEXT_DENY_LIST}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2))
+
+
+def load_context_manifest(path: Path = CONTEXT_MANIFEST_FILE) -> dict:
+    if not path.exists():
+        return {"include": list(DEFAULT_CONTEXT_INCLUDES)}
+    manifest = json.loads(path.read_text())
+    if "exclude" in manifest:
+        return {"exclude": manifest["exclude"]}
+    return {"include": manifest.get("include", DEFAULT_CONTEXT_INCLUDES)}
+
+
+def _walk(entry: Path) -> List[Path]:
+    return [
+        p for p in entry.rglob("*")
+        if p.is_file()
+        and not CONTEXT_SKIP_NAMES.intersection(p.relative_to(entry).parts)
+    ]
+
+
+def list_context_files(
+    context: Path = Path("."),
+    manifest: Optional[dict] = None,
+) -> List[Path]:
+    """
+    Return the build-context files that end up in the image, sorted by path.
+    """
+    if manifest is None:
+        manifest = load_context_manifest()
+
+    files = []
+    if "exclude" in manifest:
+        excluded = set(manifest["exclude"])
+        files.extend(
+            p for p in _walk(context)
+            if p.relative_to(context).parts[0] not in excluded
+        )
+    for include in manifest.get("include", []):
+        entry = context / include
+        if entry.is_file():
+            files.append(entry)
+        elif entry.is_dir():
+            files.extend(_walk(entry))
+    return sorted(set(files), key=lambda p: p.relative_to(context).as_posix())
+
+
+# Runtime mounts used when experiment.yaml declares none: datasets are
+# mounted read-only, outputs get a dedicated writable mount, and source code
+# comes from the image.
+DEFAULT_MOUNTS = [
+    {"source": "data", "target": "/exp/data", "read_only": True},
+    {"source": "outputs", "target": "/exp/outputs", "read_only": False},
+]
+
+
+def mount_args(mounts: List[dict], root: Path = Path(".")) -> List[str]:
+    """
+    Translate experiment.yaml mount declarations into `docker run` arguments.
+
+    Read-only sources that do not exist are skipped; writable ones are created.
+    """
+    args = []
+    for mount in mounts:
+        source = (root / mount["source"]).resolve()
+        read_only = mount.get("read_only", False)
+
+        if not source.exists():
+            if read_only:
+                continue
+            source.mkdir(parents=True)
+
+        spec = f"type=bind,source={source},target={mount['target']}"
+        if read_only:
+            spec += ",readonly"
+        args += ["--mount", spec]
+    return args
+
+
+def nested_output_mounts(mounts: List[dict], subdir: str) -> List[dict]:
+    """
+    Point every writable mount at `subdir` inside its source, so several
+    containers of one run each write to their own outputs directory.
+    """
+    return [
+        m if m.get("read_only", False)
+        else {**m, "source": f"{m['source']}/{subdir}"}
+        for m in mounts
+    ]
+
+
+def reset_fan_out_outputs(mounts: List[dict], subdirs: List[str]) -> None:
+    """
+    Remove the fan-out directories (<writable mount>/<subdir>/) left by
+    earlier runs, so a cell, shard or replica that writes nothing this time
+    cannot have its previous outputs aggregated, checked or hashed, and ids
+    from a run with a larger fan-out do not linger.
+    """
+    for mount in mounts:
+        if mount.get("read_only", False):
+            continue
+        for subdir in subdirs:
+            path = Path(mount["source"]) / subdir
+            if path.is_dir():
+                shutil.rmtree(path)
+
+
+def fan_out_specs(
+    mounts: List[dict],
+    subdir: str,
+    ids: List[str],
+    env_fn: Callable[[int], Dict[str, str]],
+    command_fn: Optional[Callable[[int], Optional[List[str]]]] = None,
+    params: Optional[List[dict]] = None,
+) -> List[dict]:
+    """
+    Plan one container per id (matrix cell, data shard or replica). Each
+    writes to <writable mount>/<subdir>/<id>/ and gets the environment
+    `env_fn(index)`, the command `command_fn(index)` (None keeps the image's
+    CMD) and, for matrix cells, its `params`.
+    """
+    return [
+        {
+            "id": spec_id,
+            "env": env_fn(index),
+            "mounts": nested_output_mounts(mounts, f"{subdir}/{spec_id}"),
+            "command": command_fn(index) if command_fn is not None else None,
+            "params": params[index] if params is not None else None,
+        }
+        for index, spec_id in enumerate(ids)
+    ]
+
+
+def resource_args(cpus: Optional[float] = None, memory: Optional[str] = None) -> List[str]:
+    """
+    Translate per-container CPU and memory limits into `docker run` arguments.
+    """
+    args = []
+    if cpus is not None:
+        args += ["--cpus", str(cpus)]
+    if memory is not None:
+        args += ["--memory", memory]
+    return args
+
+
+def format_size(num_bytes: int) -> str:
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def image_fingerprint(
+    dockerfile: Path,
+    files: List[Path],
+    context: Path = Path("."),
+    cache: Optional[HashCache] = None,
+) -> str:
+    """
+    Fingerprint everything that determines the built image: the Dockerfile
+    and the context `files` it copies (including requirements.txt).
+    """
+    sha = hashlib.new(HASH_ALGORITHM)
+    sha.update(f"Dockerfile\0{hash_file(dockerfile)}\n".encode("utf-8"))
+
+    digests = hash_paths(files, context, cache=cache)
+    for rel_path, digest in digests.items():
+        sha.update(f"{rel_path}\0{digest}\n".encode("utf-8"))
+
+    return sha.hexdigest()
+
+
+def image_tag(exp_name: str, fingerprint: str) -> str:
+    """
+    Build a per-experiment, content-addressed image tag.
+    """
+    repo = re.sub(r"[^a-z0-9._-]+", "-", exp_name.lower()).strip("._-") or "experiment"
+    return f"heda-{repo}:{fingerprint[:12]}"
+
+
+def image_exists(tag: str) -> bool:
+    """
+    Return True if an image with `tag` is present in the local Docker daemon.
+    """
+    result = subprocess.run(
+        ["docker", "image", "inspect", tag],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def prune_images(tag: str, keep: int = IMAGE_KEEP) -> List[str]:
+    """
+    Remove older tags of the repository of `tag`, keeping `tag` and the most
+    recent others up to `keep` images. Tags still used by a container fail to
+    be removed and are left alone.
+
+    Returns:
+        The tags removed.
+    """
+    repo, current = tag.rsplit(":", 1)
+    result = subprocess.run(
+        ["docker", "image", "ls", repo, "--format", "{{.Tag}}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return []
+
+    # `docker image ls` lists the newest images first.
+    older = [t for t in result.stdout.split() if t not in (current, "<none>")]
+    removed = []
+    for old in older[max(keep - 1, 0):]:
+        rm = subprocess.run(
+            ["docker", "image", "rm", f"{repo}:{old}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if rm.returncode == 0:
+            removed.append(f"{repo}:{old}")
+    return removed
+
+
+def base_image(dockerfile: Path) -> Optional[str]:
+    """
+    Return the image named by the first FROM instruction of `dockerfile`.
+    """
+    for line in dockerfile.read_text().splitlines():
+        tokens = line.split()
+        if not tokens or tokens[0].upper() != "FROM":
+            continue
+        args = [t for t in tokens[1:] if not t.startswith("--")]
+        return args[0] if args else None
+    return None
+
+
+def pull_image(image: str) -> bool:
+    """
+    Pull `image` quietly. Returns False if the pull failed.
+    """
+    result = subprocess.run(
+        ["docker", "pull", "--quiet", image],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def buildx_driver(builder: Optional[str] = BUILDX_BUILDER) -> Optional[str]:
+    """
+    Return the driver of the buildx builder in use, or None if buildx is unavailable.
+    """
+    cmd = ["docker", "buildx", "inspect"]
+    if builder:
+        cmd.append(builder)
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip() == "Driver":
+            return value.strip()
+    return None
+
+
+def ensure_heda_builder() -> Optional[str]:
+    """
+    Return the name of heda's own docker-container builder, creating it if
+    needed. Returns None if it cannot be created (e.g. no network to pull
+    the BuildKit image).
+    """
+    if buildx_driver(HEDA_BUILDER) is not None:
+        return HEDA_BUILDER
+    result = subprocess.run(
+        ["docker", "buildx", "create", "--name", HEDA_BUILDER, "--driver", "docker-container"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return HEDA_BUILDER if result.returncode == 0 else None
+
+
+def build_command(
+    dockerfile: Path,
+    tag: str,
+    context: Path = Path("."),
+    cache_dir: Path = BUILD_CACHE_DIR,
+    builder: Optional[str] = BUILDX_BUILDER,
+) -> List[str]:
+    """
+    Assemble a BuildKit build command that imports and exports layers
+    through the shared local cache directory.
+
+    Falls back to a plain `docker build` when buildx is missing. When no
+    builder is configured and the default one uses the "docker" driver,
+    which cannot export a local cache, heda's own docker-container builder
+    is used instead; if that cannot be created either, the cache is
+    skipped (see uses_build_cache).
+    """
+    driver = buildx_driver(builder)
+    if driver is None:
+        return ["docker", "build", "-f", str(dockerfile), "-t", tag, str(context)]
+
+    if driver == "docker" and not builder:
+        heda_builder = ensure_heda_builder()
+        if heda_builder is not None:
+            builder, driver = heda_builder, "docker-container"
+
+    cmd = ["docker", "buildx", "build", "--load", "-f", str(dockerfile), "-t", tag]
+    if builder:
+        cmd += ["--builder", builder]
+
+    if driver != "docker":
+        if (cache_dir / "index.json").exists():
+            cmd += ["--cache-from", f"type=local,src={cache_dir}"]
+        cmd += ["--cache-to", f"type=local,dest={cache_dir},mode=max"]
+
+    cmd.append(str(context))
+    return cmd
+
+
+def uses_build_cache(cmd: List[str]) -> bool:
+    """Whether a build command from build_command exports the shared layer cache."""
+    return "--cache-to" in cmd
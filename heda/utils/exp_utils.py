@@ -1,20 +1,4 @@
 from pathlib import Path
-import yaml
-
-def get_experiment_name(experiment_file: Path = Path("experiment.yaml")) -> str:
-    """
-    Reads experiment.yaml and returns the value of 'name'.
-    """
-    if not experiment_file.exists():
-        raise FileNotFoundError(f"{experiment_file} does not exist")
-
-    with experiment_file.open("r") as f:
-        data = yaml.safe_load(f)
-
-    if "name" not in data:
-        raise KeyError("'name' key not found in experiment.yaml")
-
-    return data["name"]
 
 def get_exp_path() -> Path:
     exp_path = Path(".") / "experiment.yaml"
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HASH_ALGORITHM = "sha256"
+HASH_CACHE_FILE = Path(".heda/hash_cache.json")
+HASH_CACHE_VERSION = 1
+
+# Files modified this recently are not cached: a write landing in the same
+# mtime tick as our read would otherwise go unnoticed on the next run.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class HashCache:
+    """
+    On-disk digest cache keyed by path, size, mtime_ns and inode.
+
+    A file whose stat signature matches its cached entry reuses the stored
+    digest instead of being read again. Renamed files are recognised by
+    their inode/size/mtime signature, and entries for deleted files are
+    pruned whenever their directory is re-hashed. Safe to share between
+    threads.
+    """
+
+    def __init__(self, path: Path = HASH_CACHE_FILE, entries: Optional[Dict[str, dict]] = None):
+        self.path = path
+        self.entries: Dict[str, dict] = entries or {}
+        self._inode_index: Optional[Dict[int, str]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path = HASH_CACHE_FILE, rehash: bool = False) -> "HashCache":
+        """
+        Load the cache from disk. With `rehash`, start empty so every file is
+        read again (the fresh digests are still saved).
+        """
+        if rehash or not path.exists():
+            return cls(path)
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls(path)
+
+        if not isinstance(data, dict) or data.get("version") != HASH_CACHE_VERSION:
+            return cls(path)
+
+        return cls(path, data.get("entries", {}))
+
+    @staticmethod
+    def _matches(entry: dict, st: os.stat_result) -> bool:
+        return (
+            entry.get("size") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+            and entry.get("inode") == st.st_ino
+        )
+
+    def lookup(self, key: str, st: os.stat_result) -> Optional[str]:
+        """
+        Return the cached digest for `key` if the file is unchanged. The entry
+        of a renamed file is moved to its new path.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._matches(entry, st):
+                return entry["digest"]
+
+            # A rename keeps inode, size and mtime; reuse the digest if the
+            # original path is gone.
+            old_key = self._index().get(st.st_ino)
+            if old_key is not None and old_key != key and not Path(old_key).exists():
+                old_entry = self.entries.get(old_key)
+                if old_entry is not None and self._matches(old_entry, st):
+                    self._remove(old_key)
+                    self._store(key, st, old_entry["digest"])
+                    return old_entry["digest"]
+
+            return None
+
+    def _index(self) -> Dict[int, str]:
+        if self._inode_index is None:
+            self._inode_index = {e["inode"]: k for k, e in self.entries.items()}
+        return self._inode_index
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None and self._inode_index is not None:
+            if self._inode_index.get(entry["inode"]) == key:
+                del self._inode_index[entry["inode"]]
+
+    def _store(self, key: str, st: os.stat_result, digest: str) -> None:
+        self._remove(key)
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            return
+        self.entries[key] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "inode": st.st_ino,
+            "digest": digest,
+        }
+        if self._inode_index is not None:
+            self._inode_index[st.st_ino] = key
+
+    def store(self, key: str, st: os.stat_result, digest: str) -> None:
+        with self._lock:
+            self._store(key, st, digest)
+
+    def prune(self, root: Path, seen: set) -> None:
+        """Drop entries under `root` that were not seen in the latest walk."""
+        prefix = root.as_posix().rstrip("/") + "/"
+        with self._lock:
+            stale = [k for k in self.entries if k.startswith(prefix) and k not in seen]
+            for key in stale:
+                self._remove(key)
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps({"version": HASH_CACHE_VERSION, "entries": self.entries})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, self.path)
+
+
+def default_workers() -> int:
+    """
+    Number of hashing threads to use when none is given.
+
+    hashlib releases the GIL while digesting large buffers, so threads
+    scale with cores as long as the disk can keep up.
+    """
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def list_files(path: Path) -> List[Path]:
+    """
+    Return every file under `path`, sorted by POSIX relative path.
+    """
+    if not path.exists():
+        return []
+    files = [p for p in path.rglob("*") if p.is_file()]
+    return sorted(files, key=lambda p: p.relative_to(path).as_posix())
+
+
+def hash_file(path: Path) -> str:
+    """
+    Compute the SHA-256 of a single file, streaming it in fixed-size chunks.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, HASH_ALGORITHM).hexdigest()
+
+
+def hash_paths(
+    files: List[Path],
+    root: Path,
+    max_workers: Optional[int] = None,
+    cache: Optional[HashCache] = None,
+) -> Dict[str, str]:
+    """
+    Hash `files` concurrently, reusing cached digests for unchanged files
+    when a `cache` is given.
+
+    Returns:
+        Mapping of POSIX path relative to `root` -> hex digest, in input order.
+    """
+    digests: Dict[str, Optional[str]] = {}
+    pending: List[tuple] = []
+
+    for f in files:
+        rel_path = f.relative_to(root).as_posix()
+        digest = None
+        if cache is not None:
+            st = f.stat()
+            digest = cache.lookup(f.as_posix(), st)
+            if digest is None:
+                pending.append((rel_path, f, st))
+        else:
+            pending.append((rel_path, f, None))
+        digests[rel_path] = digest
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers or default_workers()) as pool:
+            results = pool.map(hash_file, [f for _, f, _ in pending])
+            for (rel_path, f, st), digest in zip(pending, results):
+                digests[rel_path] = digest
+                if cache is not None:
+                    cache.store(f.as_posix(), st, digest)
+
+    return digests
+
+
+def hash_tree(
+    path: Path,
+    max_workers: Optional[int] = None,
+    cache: Optional[HashCache] = None,
+) -> Dict[str, str]:
+    """
+    Hash every file under `path` concurrently, reusing cached digests for
+    unchanged files when a `cache` is given.
+
+    Returns:
+        Mapping of POSIX relative path -> hex digest, in sorted path order.
+    """
+    files = list_files(path)
+    digests = hash_paths(files, path, max_workers=max_workers, cache=cache)
+
+    if cache is not None:
+        cache.prune(path, {f.as_posix() for f in files})
+
+    return digests
+
+
+def combine_digests(digests: Dict[str, str]) -> str:
+    """
+    Fold per-file digests into one digest, in sorted path order.
+    """
+    sha = hashlib.new(HASH_ALGORITHM)
+    for rel_path in sorted(digests):
+        sha.update(f"{rel_path}\0{digests[rel_path]}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def hash_files(
+    path: Path,
+    max_workers: Optional[int] = None,
+    cache: Optional[HashCache] = None,
+) -> str:
+    """Compute a deterministic SHA-256 over all files under `path`."""
+    return combine_digests(hash_tree(path, max_workers=max_workers, cache=cache))
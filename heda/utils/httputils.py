@@ -1,35 +1,141 @@
 import json
 import os
+import threading
 from pathlib import Path
 import requests
-from typing import Any, Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib3.util.retry import Retry
 
-from dotenv import load_dotenv
+from heda.env import load_env
+from heda.utils.multipart import MultipartStream, ProgressCallback
 
-load_dotenv()
+load_env()
 
 BACKEND_URL = os.environ.get("HEDA_BACKEND_URL")
 
+# Transient failures are retried with exponential backoff plus jitter.
+# 500 is not retried: the backend may already have applied the request.
+# POSTs are only retried when the connection could not be opened, unless
+# they carry an Idempotency-Key; read errors and retryable statuses are
+# retried for GETs and keyed POSTs.
+HTTP_RETRIES = int(os.environ.get("HEDA_HTTP_RETRIES", "3"))
+HTTP_BACKOFF = 0.5
+HTTP_BACKOFF_JITTER = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
+HTTP_POOL_SIZE = 10
+
+Timeout = Union[float, Tuple[float, float]]
+
+# (connect, read) timeouts in seconds, per endpoint. An entry also covers
+# the endpoints below it, e.g. "/publish" covers "/publish/commit".
+DEFAULT_TIMEOUT: Timeout = (10, 50)
+ENDPOINT_TIMEOUTS: Dict[str, Timeout] = {
+    "/publish": (10, 120),
+}
+
 class RequestError(Exception):
     """Custom exception for request failures."""
-    pass
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 CONFIG_DIR = Path.home() / ".config" / "heda"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 
+_sessions: Dict[bool, requests.Session] = {}
+_session_lock = threading.Lock()
+_config_cache: Optional[Tuple[Tuple[int, int], dict]] = None
+
 def load_config() -> dict:
-    if CONFIG_FILE.exists():
-        return json.loads(CONFIG_FILE.read_text())
-    return {}
+    """
+    Read the HEDA config. The parsed file is kept in memory and only re-read
+    once its mtime or size changes (e.g. after `heda login`).
+    """
+    global _config_cache
+    if not CONFIG_FILE.exists():
+        return {}
+    st = CONFIG_FILE.stat()
+    signature = (st.st_mtime_ns, st.st_size)
+    if _config_cache is None or _config_cache[0] != signature:
+        _config_cache = (signature, json.loads(CONFIG_FILE.read_text()))
+    return dict(_config_cache[1])
 
 def save_config(config: dict):
+    global _config_cache
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
     CONFIG_FILE.write_text(json.dumps(config, indent=2))
-    
+    _config_cache = None
+
+def _retry_policy(idempotent: bool = False) -> Retry:
+    options = dict(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"} if idempotent else {"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=HTTP_BACKOFF_JITTER, **options)
+    except TypeError:
+        # urllib3 < 2 has no jitter option
+        return Retry(**options)
+
+def get_session(idempotent: bool = False) -> requests.Session:
+    """
+    The shared HTTP session: pooled keep-alive connections to the backend
+    and the retry policy above. With `idempotent`, POSTs are retried like
+    GETs; only use it for requests that carry an Idempotency-Key. Safe to
+    use from several threads.
+    """
+    with _session_lock:
+        if idempotent not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=_retry_policy(idempotent),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[idempotent] = session
+        return _sessions[idempotent]
+
+def request_timeout(endpoint: str, timeout: Optional[Timeout] = None) -> Timeout:
+    if timeout is not None:
+        return timeout
+    path = endpoint
+    while path:
+        if path in ENDPOINT_TIMEOUTS:
+            return ENDPOINT_TIMEOUTS[path]
+        path = path.rpartition("/")[0]
+    return DEFAULT_TIMEOUT
+
+def _url(endpoint: str) -> str:
+    if not BACKEND_URL:
+        raise RequestError("HEDA_BACKEND_URL is not set")
+    return f"{BACKEND_URL.rstrip('/')}{endpoint}"
+
+def _auth_headers() -> Dict[str, str]:
+    token = load_config().get("access_token")
+
+    if not token:
+        raise RequestError(
+            "Not logged in. Run `heda login` first."
+        )
+
+    return {"Authorization": f"Bearer {token}"}
+
+def _idempotency_headers(key: Optional[str]) -> Dict[str, str]:
+    return {"Idempotency-Key": key} if key is not None else {}
+
 def post_json(
     endpoint: str,
     payload: Dict[str, Any],
-    timeout: int = 50
+    timeout: Optional[Timeout] = None,
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Send a POST request with JSON payload to the backend and return JSON response.
@@ -37,7 +143,9 @@ def post_json(
     Args:
         endpoint: Backend endpoint, e.g., "/init"
         payload: Dictionary to send as JSON
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds; defaults to the endpoint's timeout
+        idempotency_key: Sent as Idempotency-Key; lets the request be retried
+            after a read error or a retryable status
 
     Returns:
         Parsed JSON response
@@ -45,35 +153,30 @@ def post_json(
     Raises:
         RequestError: if the request fails or response is not 200
     """
-    url = f"{BACKEND_URL.rstrip('/')}{endpoint}"
-    config = load_config()
-    token = config.get("access_token")
-
-    if not token:
-        raise RequestError(
-            "Not logged in. Run `heda login` first."
-        )
-        
+    url = _url(endpoint)
     headers = {
-        "Authorization": f"Bearer {token}",
+        **_auth_headers(),
+        **_idempotency_headers(idempotency_key),
         "Content-Type": "application/json",
     }
     try:
-        response = requests.post(url,
+        response = get_session(idempotency_key is not None).post(url,
             headers=headers,
             json=payload,
-            timeout=timeout)
+            timeout=request_timeout(endpoint, timeout))
     except requests.RequestException as e:
         raise RequestError(f"Request to {url} failed: {e}") from e
 
     if response.status_code == 401:
         raise RequestError(
-            "Authentication failed. Please run `heda login` again."
+            "Authentication failed. Please run `heda login` again.",
+            status_code=401,
         )
 
     if response.status_code != 200:
         raise RequestError(
-            f"Request failed [{response.status_code}]: {response.text}"
+            f"Request failed [{response.status_code}]: {response.text}",
+            status_code=response.status_code,
         )
 
     try:
@@ -85,56 +188,60 @@ def post_multipart(
     endpoint: str,
     files: List[Path],
     form_data: Optional[Dict[str, Any]] = None,
-    timeout: int = 120
+    timeout: Optional[Timeout] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    names: Optional[List[str]] = None,
+    field: str = "files",
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """POST multipart/form-data with files and optional form fields."""
-    url = f"{BACKEND_URL.rstrip('/')}{endpoint}"
-    
-    config = load_config()
-    token = config.get("access_token")
-
-    if not token:
-        raise RequestError(
-            "Not logged in. Run `heda login` first."
-        )
-        
-    headers = {
-        "Authorization": f"Bearer {token}",
-    }
+    """
+    POST multipart/form-data with files and optional form fields.
 
+    Each file is sent in a `field` part named by its path relative to the
+    current directory, or by the matching entry of `names`. The body is
+    streamed from disk, so memory use does not grow with the size of the
+    files; `on_progress` receives (bytes sent, total bytes). As with
+    `post_json`, an `idempotency_key` allows retries beyond connect errors.
+    """
+    url = _url(endpoint)
     root = Path(".").resolve()
 
-    multipart_files: List[Tuple[str, Tuple[str, bytes, str]]] = [
-        (
-            "files",
-            (
-                str(f.resolve().relative_to(root)),
-                f.read_bytes(),
-                "application/octet-stream",
-            ),
-        )
-        for f in files
-    ]
+    if names is None:
+        names = [str(f.resolve().relative_to(root)) for f in files]
+    body = MultipartStream(
+        [(field, name, f) for name, f in zip(names, files)],
+        fields=form_data,
+        on_progress=on_progress,
+    )
+    headers = {
+        **_auth_headers(),
+        **_idempotency_headers(idempotency_key),
+        "Content-Type": body.content_type,
+    }
 
     try:
-        response = requests.post(
+        response = get_session(idempotency_key is not None).post(
             url,
             headers=headers,
-            files=multipart_files,
-            data=form_data,
-            timeout=timeout,
+            data=body,
+            timeout=request_timeout(endpoint, timeout),
         )
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
-        raise RequestError(f"Multipart request to {url} failed: {e}") from e
+        status_code = e.response.status_code if e.response is not None else None
+        raise RequestError(
+            f"Multipart request to {url} failed: {e}", status_code=status_code
+        ) from e
     except ValueError as e:
         raise RequestError(f"Invalid JSON response from {url}: {e}") from e
+    finally:
+        body.close()
 
 def get_json(
     endpoint: str,
     params: Optional[Dict[str, Any]] = None,
-    timeout: int = 50
+    timeout: Optional[Timeout] = None
 ) -> Dict[str, Any]:
     """
     Send a GET request with query parameters to the backend and return JSON response.
@@ -142,7 +249,7 @@ def get_json(
     Args:
         endpoint: Backend endpoint, e.g., "/onboard/status"
         params: Dictionary of query parameters
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds; defaults to the endpoint's timeout
 
     Returns:
         Parsed JSON response
@@ -150,32 +257,27 @@ def get_json(
     Raises:
         RequestError: if the request fails or response is not 200
     """
-    url = f"{BACKEND_URL.rstrip('/')}{endpoint}"
-    config = load_config()
-    token = config.get("access_token")
-
-    if not token:
-        raise RequestError(
-            "Not logged in. Run `heda login` first."
-        )
-        
+    url = _url(endpoint)
     headers = {
-        "Authorization": f"Bearer {token}",
+        **_auth_headers(),
         "Content-Type": "application/json",
     }
 
     try:
-        response = requests.get(
+        response = get_session().get(
             url,
             headers=headers,
             params=params,
-            timeout=timeout,
+            timeout=request_timeout(endpoint, timeout),
         )
     except requests.RequestException as e:
         raise RequestError(f"Request to {url} failed: {e}") from e
 
     if response.status_code != 200:
-        raise RequestError(f"Request failed [{response.status_code}]: {response.text}")
+        raise RequestError(
+            f"Request failed [{response.status_code}]: {response.text}",
+            status_code=response.status_code,
+        )
 
     try:
         return response.json()
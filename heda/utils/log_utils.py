@@ -0,0 +1,96 @@
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+LOGS_DIR = Path(".heda/logs")
+
+# Per-file size cap and number of rotated files kept (<name>.log.1, .2, ...).
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# Lines kept in memory for the live view and failure output.
+TAIL_LINES = 20
+
+# Longest line read at once; longer lines are split so memory stays bounded.
+MAX_LINE_BYTES = 64 * 1024
+
+
+def new_tail(lines: int = TAIL_LINES) -> Deque[str]:
+    """A bounded buffer holding the last `lines` lines of output."""
+    return deque(maxlen=lines)
+
+
+class RotatingLogWriter:
+    """
+    Append-only log file that rotates to <name>.1, <name>.2, ... once it
+    grows past `max_bytes`, keeping at most `backup_count` old files.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def write(self, data: bytes) -> None:
+        if self._size + len(data) > self.max_bytes and self._size > 0:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, "wb")
+        self._size = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def stream_process(
+    cmd: List[str],
+    log_path: Path,
+    tail: Optional[Deque[str]] = None,
+    prefix: str = "",
+    env: Optional[Dict[str, str]] = None,
+) -> int:
+    """
+    Run `cmd`, streaming its combined stdout/stderr line by line into a
+    rotating log file and the bounded `tail` buffer.
+
+    Returns:
+        The process exit code.
+    """
+    writer = RotatingLogWriter(log_path)
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+        )
+        for raw in iter(lambda: process.stdout.readline(MAX_LINE_BYTES), b""):
+            writer.write(raw)
+            if tail is not None:
+                tail.append(prefix + raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        process.stdout.close()
+        return process.wait()
+    finally:
+        writer.close()
@@ -0,0 +1,91 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from heda.utils.hash_utils import HASH_ALGORITHM
+
+# Node layout (JSON-serialisable):
+#   file:      {"hash": <digest>}
+#   directory: {"hash": <digest>, "children": {<name>: <node>, ...}}
+
+
+def _dir_hash(children: Dict[str, dict]) -> str:
+    sha = hashlib.new(HASH_ALGORITHM)
+    for name in sorted(children):
+        node = children[name]
+        kind = "tree" if "children" in node else "blob"
+        sha.update(f"{kind}\0{name}\0{node['hash']}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def build_tree(digests: Dict[str, str]) -> dict:
+    """
+    Build a Merkle tree from a mapping of POSIX relative path -> file digest.
+
+    Every directory node carries the hash of its sorted children, so the
+    root hash changes if and only if some file below it changes.
+    """
+    root: dict = {"children": {}}
+    for rel_path in sorted(digests):
+        *parents, name = rel_path.split("/")
+        node = root
+        for part in parents:
+            node = node["children"].setdefault(part, {"children": {}})
+        node["children"][name] = {"hash": digests[rel_path]}
+
+    def seal(node: dict) -> None:
+        for child in node["children"].values():
+            if "children" in child:
+                seal(child)
+        node["hash"] = _dir_hash(node["children"])
+
+    seal(root)
+    return root
+
+
+def iter_files(node: dict, prefix: str = "") -> List[Tuple[str, str]]:
+    """List (path, digest) for every file below `node`."""
+    if "children" not in node:
+        return [(prefix, node["hash"])]
+    files = []
+    for name in sorted(node["children"]):
+        child_prefix = f"{prefix}/{name}" if prefix else name
+        files.extend(iter_files(node["children"][name], child_prefix))
+    return files
+
+
+def diff_trees(
+    old: Optional[dict],
+    new: Optional[dict],
+    prefix: str = "",
+) -> List[Tuple[str, str]]:
+    """
+    Compare two Merkle trees, descending only into subtrees whose hashes differ.
+
+    Returns:
+        Sorted list of (path, status) with status "added", "removed" or "modified".
+    """
+    if old is not None and new is not None and old["hash"] == new["hash"]:
+        return []
+    if old is None:
+        return [(path, "added") for path, _ in iter_files(new, prefix)]
+    if new is None:
+        return [(path, "removed") for path, _ in iter_files(old, prefix)]
+
+    old_is_dir = "children" in old
+    new_is_dir = "children" in new
+    if not old_is_dir and not new_is_dir:
+        return [(prefix, "modified")]
+    if old_is_dir != new_is_dir:
+        return diff_trees(old, None, prefix) + diff_trees(None, new, prefix)
+
+    changes = []
+    for name in sorted(set(old["children"]) | set(new["children"])):
+        child_prefix = f"{prefix}/{name}" if prefix else name
+        changes.extend(
+            diff_trees(
+                old["children"].get(name),
+                new["children"].get(name),
+                child_prefix,
+            )
+        )
+    return changes
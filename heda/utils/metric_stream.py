@@ -0,0 +1,185 @@
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+READ_CHUNK = 64 * 1024
+
+# Experiments may append one JSON object of metrics per line to this file in
+# their outputs directory, e.g. {"step": 10, "accuracy": 0.61}. The early-stop
+# watcher tails it during the run and `heda check` aggregates it afterwards.
+METRICS_STREAM = "metrics.jsonl"
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+AGGREGATES = ["count", "first", "last", "min", "max", "sum", "mean", *QUANTILES]
+
+
+class MetricStreamError(Exception):
+    pass
+
+
+def aggregate_key(metric: str, aggregate: str) -> str:
+    """Name under which an aggregate of a streamed metric is reported."""
+    return f"{aggregate}({metric})"
+
+
+def iter_jsonl(path: Path) -> Iterator[dict]:
+    """Yield the JSON object on each non-blank line of a JSON Lines file."""
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise MetricStreamError(f"{path.as_posix()} line {line_no}: {e}")
+            if not isinstance(record, dict):
+                raise MetricStreamError(f"{path.as_posix()} line {line_no}: expected a JSON object")
+            yield record
+
+
+def iter_json_array(path: Path) -> Iterator[dict]:
+    """
+    Yield the objects of a top-level JSON array one at a time, reading the
+    file in chunks so only one element is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(READ_CHUNK)
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            return bool(chunk)
+
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+                pos += 1
+            if pos == len(buf):
+                if not fill():
+                    raise MetricStreamError(f"{path.as_posix()}: unexpected end of JSON array")
+                continue
+
+            if not started:
+                if buf[pos] != "[":
+                    raise MetricStreamError(f"{path.as_posix()}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                record, end = None, None
+            # A value ending exactly at the buffer edge may be cut short
+            # (e.g. a number), so only trust it once more input follows.
+            if end is None or (end == len(buf) and not eof):
+                if not fill():
+                    raise MetricStreamError(f"{path.as_posix()}: invalid or truncated JSON array")
+                continue
+            if not isinstance(record, dict):
+                raise MetricStreamError(f"{path.as_posix()}: array elements must be JSON objects")
+            pos = end
+            yield record
+
+
+def is_json_array(path: Path) -> bool:
+    """True if the JSON document in `path` is an array (checks the first character only)."""
+    with open(path, "r") as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                return char == "["
+
+
+def iter_records(path: Path) -> Iterator[dict]:
+    if path.suffix == ".jsonl":
+        return iter_jsonl(path)
+    return iter_json_array(path)
+
+
+def quantile(values: list, p: float) -> float:
+    """The `p` quantile of sorted `values`, interpolating between ranks."""
+    rank = p * (len(values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class StreamAggregate:
+    """
+    Running aggregates of one metric. Quantiles are exact: when any are
+    requested, the metric's values are buffered as doubles (8 bytes per
+    record) and sorted once.
+    """
+
+    def __init__(self, quantiles: Iterable[str] = ()):
+        self.count = 0
+        self.total = 0.0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.quantiles = list(quantiles)
+        self._values: Optional[array] = array("d") if self.quantiles else None
+        self._sorted: Optional[list] = None
+
+    def add(self, x: float) -> None:
+        if self.count == 0:
+            self.first = self.min = self.max = x
+        else:
+            self.min = min(self.min, x)
+            self.max = max(self.max, x)
+        self.count += 1
+        self.total += x
+        self.last = x
+        if self._values is not None:
+            self._values.append(x)
+            self._sorted = None
+
+    def value(self, aggregate: str) -> Optional[float]:
+        if aggregate == "count":
+            return self.count
+        if self.count == 0:
+            return None
+        if aggregate == "sum":
+            return self.total
+        if aggregate == "mean":
+            return self.total / self.count
+        if aggregate in self.quantiles:
+            if self._sorted is None:
+                self._sorted = sorted(self._values)
+            return quantile(self._sorted, QUANTILES[aggregate])
+        return getattr(self, aggregate)
+
+
+def aggregate_records(records: Iterable[dict], requested: Dict[str, Set[str]]) -> Dict[str, dict]:
+    """
+    Compute the `requested` aggregates ({metric: {aggregate, ...}}) over a
+    stream of metric records in a single pass. Non-numeric values are skipped.
+
+    Returns:
+        {metric: {aggregate: value}}; values are None for metrics never seen.
+    """
+    trackers = {
+        metric: StreamAggregate(a for a in aggregates if a in QUANTILES)
+        for metric, aggregates in requested.items()
+    }
+    for record in records:
+        for metric, tracker in trackers.items():
+            value = record.get(metric)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                tracker.add(value)
+
+    return {
+        metric: {aggregate: trackers[metric].value(aggregate) for aggregate in aggregates}
+        for metric, aggregates in requested.items()
+    }
@@ -0,0 +1,126 @@
+import os
+import secrets
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class MultipartStream:
+    """
+    A multipart/form-data body read lazily from disk.
+
+    Behaves like a read-only binary file of known length (`read`, `__len__`,
+    `tell`, `seek`), so `requests` sends it with a Content-Length and in
+    chunks, and urllib3 can rewind it to retry. Only one file is open and
+    one chunk is in memory at a time.
+
+    Args:
+        files: (field name, file name, path) per file part
+        fields: plain form fields sent before the files
+        on_progress: called with (bytes read, total bytes) after every read
+    """
+
+    def __init__(
+        self,
+        files: List[Tuple[str, str, Path]],
+        fields: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ):
+        self.boundary = f"heda-{secrets.token_hex(16)}"
+        self.on_progress = on_progress
+        self._segments: List[Tuple[int, Union[bytes, Path]]] = []
+
+        for name, value in (fields or {}).items():
+            self._add_bytes(
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f"{value}\r\n".encode("utf-8")
+            )
+        for name, filename, path in files:
+            self._add_bytes(
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"; filename="{_quote(filename)}"\r\n'
+                "Content-Type: application/octet-stream\r\n\r\n".encode("utf-8")
+            )
+            self._segments.append((path.stat().st_size, path))
+            self._add_bytes(b"\r\n")
+        self._add_bytes(f"--{self.boundary}--\r\n".encode("utf-8"))
+
+        self._length = sum(size for size, _ in self._segments)
+        self._position = 0
+        self._index = 0
+        self._offset = 0
+        self._file: Optional[BinaryIO] = None
+
+    def _add_bytes(self, data: bytes) -> None:
+        self._segments.append((len(data), data))
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._length
+        offset = max(0, min(offset, self._length))
+
+        self._close_file()
+        self._position = offset
+        self._index = 0
+        while self._index < len(self._segments) and offset >= self._segments[self._index][0]:
+            offset -= self._segments[self._index][0]
+            self._index += 1
+        self._offset = offset
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length - self._position
+
+        chunks = []
+        while size > 0 and self._index < len(self._segments):
+            segment_size, source = self._segments[self._index]
+            take = min(size, segment_size - self._offset)
+            if isinstance(source, bytes):
+                chunk = source[self._offset:self._offset + take]
+            else:
+                if self._file is None:
+                    self._file = open(source, "rb")
+                    self._file.seek(self._offset)
+                chunk = self._file.read(take)
+                if len(chunk) != take:
+                    raise OSError(f"{source} changed size during upload")
+
+            chunks.append(chunk)
+            size -= take
+            self._offset += take
+            self._position += take
+            if self._offset == segment_size:
+                self._close_file()
+                self._index += 1
+                self._offset = 0
+
+        if self.on_progress is not None:
+            self.on_progress(self._position, self._length)
+        return b"".join(chunks)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self._close_file()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from heda.utils.hash_utils import HASH_ALGORITHM
+
+RUN_CACHE_DIR = Path(".heda/run_cache")
+
+# Cached runs can hold large outputs; only the most recent ones are kept.
+RUN_CACHE_MAX_ENTRIES = 5
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hardlink `src` to `dst`, copying when linking is not possible."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def run_cache_key(image_tag: str, procedure: dict, input_hashes: Dict[str, str]) -> str:
+    """
+    Fingerprint a run: the image it executes, the procedure (entrypoint,
+    mounts, ...) and the content hash of every input directory.
+    """
+    sha = hashlib.new(HASH_ALGORITHM)
+    sha.update(f"image\0{image_tag}\n".encode("utf-8"))
+    sha.update(f"procedure\0{json.dumps(procedure, sort_keys=True)}\n".encode("utf-8"))
+    for source in sorted(input_hashes):
+        sha.update(f"input\0{source}\0{input_hashes[source]}\n".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def lookup(key: str, cache_dir: Path = RUN_CACHE_DIR) -> Optional[dict]:
+    """Return the stored result of a cached run, or None on a miss."""
+    result_path = cache_dir / key / "result.json"
+    if not result_path.exists():
+        return None
+    try:
+        return json.loads(result_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def restore(key: str, outputs: List[Path], cache_dir: Path = RUN_CACHE_DIR) -> None:
+    """
+    Replace each output directory with its cached copy. Files are hardlinked
+    from the cache entry, so restoring costs no copying or extra disk.
+    """
+    entry = cache_dir / key / "files"
+    for output in outputs:
+        if output.exists():
+            shutil.rmtree(output)
+        cached = entry / output.as_posix()
+        if cached.exists():
+            shutil.copytree(cached, output, copy_function=_link_or_copy)
+        else:
+            output.mkdir(parents=True)
+    (cache_dir / key).touch()
+
+
+def release(outputs: List[Path]) -> None:
+    """
+    Unlink output files shared with a cache entry before a fresh run writes
+    to the output directories, so writes in place cannot change the cached
+    copy. Their content stays in the run cache.
+    """
+    for output in outputs:
+        if not output.is_dir():
+            continue
+        for path in output.rglob("*"):
+            if path.is_file() and not path.is_symlink() and path.stat().st_nlink > 1:
+                path.unlink()
+
+
+def store(
+    key: str,
+    outputs: List[Path],
+    result: dict,
+    cache_dir: Path = RUN_CACHE_DIR,
+) -> None:
+    """
+    Save the output directories and claim result of a run under `key`.
+
+    Output files are hardlinked into the entry rather than copied (see
+    release). The entry is assembled in a temporary directory and renamed
+    into place, so an interrupted store never leaves a half-written hit
+    behind.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_entry = cache_dir / f".{key}.tmp"
+    if tmp_entry.exists():
+        shutil.rmtree(tmp_entry)
+
+    for output in outputs:
+        if output.exists():
+            shutil.copytree(
+                output, tmp_entry / "files" / output.as_posix(), copy_function=_link_or_copy
+            )
+    tmp_entry.mkdir(exist_ok=True)
+    (tmp_entry / "result.json").write_text(
+        json.dumps({**result, "created": time.time()}, indent=2)
+    )
+
+    entry = cache_dir / key
+    if entry.exists():
+        shutil.rmtree(entry)
+    tmp_entry.rename(entry)
+
+    _evict(cache_dir)
+
+
+def _evict(cache_dir: Path) -> None:
+    entries = sorted(
+        (p for p in cache_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in entries[RUN_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(stale, ignore_errors=True)
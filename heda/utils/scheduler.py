@@ -0,0 +1,100 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from heda.ui.progress import console, parallel_steps
+
+
+class SkipStage(Exception):
+    """Raised by a stage function to mark the stage as skipped, with a reason."""
+    pass
+
+
+@dataclass
+class Stage:
+    """
+    One unit of work in a pipeline.
+
+    `func` receives the results of every stage completed so far (including
+    all of `deps`) and returns this stage's result. A skipped stage counts
+    as completed with a result of None. `tail`, if given, is a bounded
+    buffer the stage fills with its latest output lines; it is shown while
+    the stage runs and printed if it fails.
+    """
+    name: str
+    description: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: Sequence[str] = ()
+    success_message: Optional[str] = None
+    failure_message: Optional[str] = None
+    tail: Optional[Iterable[str]] = None
+
+
+def run_stages(stages: List[Stage], max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run `stages` as soon as their dependencies complete, independent stages
+    concurrently, rendering them as parallel steps.
+
+    On the first failure no further stages are started; stages already
+    running are allowed to finish, then the error is re-raised.
+
+    Returns:
+        Mapping of stage name -> result.
+    """
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError("Stage names must be unique")
+    for stage in stages:
+        unknown = set(stage.deps) - names
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(unknown)}")
+
+    results: Dict[str, Any] = {}
+    pending = {stage.name: stage for stage in stages}
+    running: Dict[Future, Stage] = {}
+    error: Optional[BaseException] = None
+
+    with parallel_steps() as board, ThreadPoolExecutor(
+        max_workers=max_workers or max(1, len(stages))
+    ) as pool:
+        for stage in stages:
+            board.add(stage.name, stage.description)
+
+        while pending or running:
+            if error is None:
+                ready = [
+                    stage for stage in pending.values()
+                    if all(dep in results for dep in stage.deps)
+                ]
+                for stage in ready:
+                    del pending[stage.name]
+                    board.start(stage.name, stage.tail)
+                    running[pool.submit(stage.func, dict(results))] = stage
+
+            if not running:
+                if error is None and pending:
+                    raise ValueError(f"Stage dependency cycle among: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except SkipStage as skip:
+                    results[stage.name] = None
+                    board.skip(stage.name, str(skip) or None)
+                except Exception as exc:
+                    board.fail(stage.name, stage.failure_message)
+                    if stage.tail:
+                        console.print("\n".join(stage.tail), markup=False, highlight=False)
+                    console.print(f"[red]Error:[/] {exc}", highlight=False)
+                    if error is None:
+                        error = exc
+                else:
+                    board.succeed(stage.name, stage.success_message)
+
+    if error is not None:
+        raise error
+
+    return results
@@ -0,0 +1,95 @@
+import json
+import math
+from pathlib import Path
+from typing import Dict, List
+
+# Two-sided 95% Student t critical values by degrees of freedom; the normal
+# value is used beyond the table.
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+Z_95 = 1.960
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def summarize(values: List[float], with_ci: bool = False) -> Dict[str, float]:
+    """
+    Summary statistics of a list of numbers: count, mean, sample std (0 for
+    a single value), min and max, plus a 95% confidence interval of the mean
+    (ci95_low/ci95_high) when `with_ci` is set.
+    """
+    n = len(values)
+    mean = sum(values) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+    summary = {
+        "count": n,
+        "mean": mean,
+        "std": std,
+        "min": min(values),
+        "max": max(values),
+    }
+
+    if with_ci:
+        critical = T_95[n - 2] if 1 < n <= len(T_95) + 1 else Z_95
+        half_width = critical * std / math.sqrt(n)
+        summary["ci95_low"] = mean - half_width
+        summary["ci95_high"] = mean + half_width
+
+    return summary
+
+
+def summarize_metrics(runs: List[dict], with_ci: bool = False) -> Dict[str, float]:
+    """
+    Summarise every numeric metric across several runs' metrics.
+
+    Returns:
+        Flat mapping of "<metric>.<statistic>" -> value, e.g. "accuracy.mean".
+    """
+    values: Dict[str, List[float]] = {}
+    for metrics in runs:
+        for name, value in metrics.items():
+            if is_number(value):
+                values.setdefault(name, []).append(value)
+
+    summary = {}
+    for name, series in values.items():
+        for stat, value in summarize(series, with_ci=with_ci).items():
+            summary[f"{name}.{stat}"] = value
+    return summary
+
+
+def write_summary_metrics(
+    run_dirs: List[Path],
+    outputs: Path = Path("outputs"),
+    with_ci: bool = False,
+    mean_as_value: bool = False,
+) -> Dict[str, float]:
+    """
+    Summarise the metrics.json of every run directory (see summarize_metrics)
+    into outputs/metrics.json. Runs without readable metrics are left out.
+    With `mean_as_value`, the plain "<metric>" key also holds the mean.
+    """
+    runs = []
+    for run_dir in run_dirs:
+        try:
+            metrics = json.loads((run_dir / "metrics.json").read_text())
+        except (OSError, ValueError):
+            continue
+        if isinstance(metrics, dict):
+            runs.append(metrics)
+
+    summary = summarize_metrics(runs, with_ci=with_ci)
+    if mean_as_value:
+        for key in list(summary):
+            name, _, stat = key.rpartition(".")
+            if stat == "mean":
+                summary[name] = summary[key]
+
+    outputs.mkdir(parents=True, exist_ok=True)
+    (outputs / "metrics.json").write_text(json.dumps(summary, indent=2, sort_keys=True))
+    return summary
@@ -1,31 +1,107 @@
+import copy
+import threading
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Tuple
+
 import yaml
-from jsonschema import validate, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
 from heda.schema import EXPERIMENT_SCHEMA
 
+EXPERIMENT_FILE = Path("experiment.yaml")
+
+# libyaml's C parser when PyYAML was built with it, else the pure-Python one.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class ExperimentValidationError(Exception):
     pass
 
 
-def load_experiment_yaml(path: Path) -> dict:
+_validator = None
+
+# Resolved path -> ((mtime_ns, size), parsed data, passed validation)
+_cache: Dict[Path, Tuple[Tuple[int, int], dict, bool]] = {}
+_cache_lock = threading.Lock()
+
+
+def experiment_validator():
+    """The experiment schema validator, compiled on first use."""
+    global _validator
+    if _validator is None:
+        cls = validator_for(EXPERIMENT_SCHEMA)
+        cls.check_schema(EXPERIMENT_SCHEMA)
+        _validator = cls(EXPERIMENT_SCHEMA)
+    return _validator
+
+
+def _parse(path: Path) -> Tuple[Tuple[int, int], dict]:
     if not path.exists():
         raise ExperimentValidationError("experiment.yaml not found")
 
+    st = path.stat()
+    signature = (st.st_mtime_ns, st.st_size)
+    key = path.resolve()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return signature, cached[1]
+
     try:
         with open(path, "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=YAML_LOADER)
     except yaml.YAMLError as e:
         raise ExperimentValidationError(f"Invalid YAML: {e}")
 
     if not isinstance(data, dict):
         raise ExperimentValidationError("experiment.yaml must be a YAML object")
 
-    return data
+    with _cache_lock:
+        _cache[key] = (signature, data, False)
+    return signature, data
+
+
+def load_experiment_yaml(path: Path) -> dict:
+    """
+    Parse experiment.yaml. Results are cached per file and reused until its
+    mtime or size changes; callers get their own copy.
+    """
+    _, data = _parse(path)
+    return copy.deepcopy(data)
 
 
 def validate_experiment(data: dict) -> None:
-    try:
-        validate(instance=data, schema=EXPERIMENT_SCHEMA)
-    except ValidationError as e:
-        raise ExperimentValidationError(e.message)
+    error = best_match(experiment_validator().iter_errors(data))
+    if error is not None:
+        raise ExperimentValidationError(error.message)
+
+
+@dataclass(frozen=True)
+class ExperimentContext:
+    """A parsed and validated experiment.yaml, loaded once per command."""
+    path: Path
+    data: dict
+
+    @property
+    def name(self) -> str:
+        return self.data["name"]
+
+
+def load_experiment(path: Path = EXPERIMENT_FILE) -> ExperimentContext:
+    """
+    Load and validate experiment.yaml. A file that already passed validation
+    with the same mtime and size is not validated again.
+    """
+    signature, data = _parse(path)
+    key = path.resolve()
+    with _cache_lock:
+        validated = _cache.get(key, (None, None, False))[2]
+
+    if not validated:
+        validate_experiment(data)
+        with _cache_lock:
+            if key in _cache and _cache[key][0] == signature:
+                _cache[key] = (signature, data, True)
+
+    return ExperimentContext(path=path, data=copy.deepcopy(data))
@@ -1,47 +1,182 @@
-import hashlib
 import json
 from pathlib import Path
 from datetime import datetime
-import subprocess
+from typing import List, Optional, Sequence, Tuple
 
-from heda.check import ClaimCheckError, check_claims
+from tabulate import tabulate
+
+from heda.replicas import REPLICAS_DIR, replica_ids
+from heda.run import ExperimentRunError, load_finalized_experiment, pipeline_stages
+from heda.utils.hash_utils import HashCache, hash_tree
+from heda.utils.merkle import build_tree, diff_trees
+from heda.utils.scheduler import Stage, run_stages
+
+# verification.json manifest section -> directory it describes
+MANIFEST_SECTIONS = {
+    "inputs": Path("data"),
+    "outputs": Path("outputs"),
+}
 
 class VerificationError(Exception):
     pass
 
-def hash_files(path: Path) -> str:
-    """Compute SHA-256 of all files under `path`, sorted by name."""
-    sha = hashlib.sha256()
-    for file in sorted(path.rglob("*")):
-        if file.is_file():
-            sha.update(file.read_bytes())
-    return sha.hexdigest()
+def build_manifest(cache: Optional[HashCache] = None) -> dict:
+    """Build the Merkle manifest of every manifest section in the working tree."""
+    return {
+        section: build_tree(hash_tree(directory, cache=cache))
+        for section, directory in MANIFEST_SECTIONS.items()
+    }
+
+def load_manifest(path: Path) -> dict:
+    if not path.exists():
+        raise VerificationError(f"{path} not found")
 
-def verify_experiment() -> None:
-    # 1. Run the experiment (build + run Docker)
     try:
-        subprocess.run(["heda", "run"], check=True)
-    except subprocess.CalledProcessError:
-        raise VerificationError("Experiment execution failed")
+        verification = json.loads(path.read_text())
+    except json.JSONDecodeError as e:
+        raise VerificationError(f"Invalid {path}: {e}")
+
+    manifest = verification.get("manifest") if isinstance(verification, dict) else None
+    if not manifest:
+        raise VerificationError(
+            f"{path} has no per-file manifest. Re-run `heda verify` to generate one."
+        )
+    return manifest
+
+def diff_manifests(old: dict, new: dict) -> List[Tuple[str, str]]:
+    """List (path, status) for every file that differs between two manifests."""
+    changes = []
+    for section, directory in MANIFEST_SECTIONS.items():
+        changes.extend(
+            diff_trees(old.get(section), new.get(section), directory.as_posix())
+        )
+    return changes
 
-    # 2. Check claims
+def diff_verification(
+    reference: Path,
+    other: Optional[Path] = None,
+    rehash: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Compare `reference` against `other`, or against the working tree when no
+    `other` is given, and print the files that differ.
+    """
+    old = load_manifest(reference)
+
+    if other is not None:
+        new = load_manifest(other)
+    else:
+        cache = HashCache.load(rehash=rehash)
+        new = build_manifest(cache)
+        cache.save()
+
+    changes = diff_manifests(old, new)
+
+    if changes:
+        print(tabulate(changes, headers=["Path", "Status"], tablefmt="github"))
+    else:
+        print("✔ No differences")
+
+    return changes
+
+def replica_report(outputs_tree: dict, replicas: int) -> dict:
+    """
+    Compare the output Merkle roots of every replica to judge determinism.
+    """
+    replica_dirs = outputs_tree.get("children", {}).get(REPLICAS_DIR, {}).get("children", {})
+    roots = {
+        replica_id: replica_dirs[replica_id]["hash"] if replica_id in replica_dirs else None
+        for replica_id in replica_ids(replicas)
+    }
+    return {
+        "count": replicas,
+        "deterministic": None not in roots.values() and len(set(roots.values())) == 1,
+        "output_roots": roots,
+    }
+
+def verify_experiment(
+    rehash: bool = False,
+    use_cache: bool = True,
+    run_args: Sequence[str] = (),
+    replicas: int = 1,
+    experiment: Optional[dict] = None,
+) -> None:
+    # 1. Load + validate experiment.yaml once for the whole pipeline
+    #    (unless the caller already has it)
     try:
-        check_claims()
-        claims_passed = True
-    except ClaimCheckError:
-        claims_passed = False
+        experiment = load_finalized_experiment(experiment)
+    except ExperimentRunError as e:
+        raise VerificationError(str(e))
+
+    cache = HashCache.load(rehash=rehash)
 
-    # 3. Compute hashes
-    input_hash = hash_files(Path("data"))  # or any input dir
-    output_hash = hash_files(Path("outputs"))
+    def hash_outputs(results: dict):
+        return hash_tree(MANIFEST_SECTIONS["outputs"], cache=cache)
+
+    # 2. Run the experiment in-process as one stage graph: inputs are hashed
+    #    while the image builds and the container runs, outputs are hashed
+    #    while claims are evaluated (once)
+    stages = pipeline_stages(
+        experiment,
+        cache,
+        use_cache=use_cache,
+        hash_inputs=True,
+        run_args=run_args,
+        replicas=replicas,
+    )
+    stages.append(
+        Stage(
+            "outputs",
+            "Hashing experiment outputs",
+            hash_outputs,
+            deps=("run",),
+            success_message="Experiment outputs hashed",
+            failure_message="Failed to hash experiment outputs",
+        )
+    )
+
+    try:
+        results = run_stages(stages)
+    except ExperimentRunError as e:
+        raise VerificationError(f"Experiment execution failed: {e}")
+    finally:
+        cache.save()
+
+    claims_passed = results["claims"] is None
+    cache_key, cached = results.get("cache") or (None, False)
+
+    # 3. Compute per-file Merkle manifests (unchanged files reuse their cached digests)
+    input_digests = results["inputs"].get(MANIFEST_SECTIONS["inputs"].as_posix())
+    if input_digests is None:
+        input_digests = hash_tree(MANIFEST_SECTIONS["inputs"], cache=cache)
+        cache.save()
+
+    manifest = {
+        "inputs": build_tree(input_digests),
+        "outputs": build_tree(results["outputs"]),
+    }
 
     # 4. Build verification object
     verification = {
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "input_hash": input_hash,
-        "output_hash": output_hash,
+        "input_hash": manifest["inputs"]["hash"],
+        "output_hash": manifest["outputs"]["hash"],
         "claims_passed": claims_passed,
+        # True when no container ran: outputs were restored from the run
+        # cache entry `run_cache_key` (use --no-cache to force a fresh run).
+        "cached": cached,
+        "manifest": manifest,
     }
+    if cached:
+        verification["run_cache_key"] = cache_key
+        print("! Outputs were restored from the run cache; no container ran (use --no-cache to re-run)")
+
+    if replicas > 1:
+        verification["replicas"] = replica_report(manifest["outputs"], replicas)
+        if verification["replicas"]["deterministic"]:
+            print(f"✔ All {replicas} replicas produced identical outputs")
+        else:
+            print("✗ Replicas produced differing outputs (nondeterministic run)")
 
     # 5. Save verification.json
     verification_path = Path("verification.json")
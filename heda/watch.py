@@ -0,0 +1,143 @@
+import json
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from heda.claim_plan import COMPARATORS
+from heda.utils.metric_stream import METRICS_STREAM
+
+POLL_INTERVAL = 0.5
+
+# Seconds `docker stop` waits for the container to exit before killing it.
+STOP_TIMEOUT = 10
+
+class ClaimUnreachable(Exception):
+    pass
+
+def stream_path(mounts: List[dict]) -> Optional[Path]:
+    """The metrics stream of a container: in its first writable mount."""
+    for mount in mounts:
+        if not mount.get("read_only", False):
+            return Path(mount["source"]) / METRICS_STREAM
+    return None
+
+def describe(claim: dict) -> str:
+    return f"{claim['metric']} {claim['operator']} {claim['value']}"
+
+def check_reachable(claim: dict, actual: Optional[float], elapsed: float) -> None:
+    """
+    Apply a claim's `early_stop` rule to the latest streamed value.
+
+    Rules:
+        deadline: the claim must hold within this many seconds of the start
+        monotone: the metric only ever "increasing"/"decreasing", so once it
+            has moved past the expected value the claim cannot recover
+
+    Raises:
+        ClaimUnreachable: if the claim can no longer be met.
+    """
+    rule = claim["early_stop"]
+    operator = claim["operator"]
+    expected = claim["value"]
+    holds = actual is not None and COMPARATORS[operator](actual, expected)
+
+    deadline = rule.get("deadline")
+    if deadline is not None and elapsed >= deadline and not holds:
+        shown = "no value" if actual is None else f"latest {claim['metric']} = {actual}"
+        raise ClaimUnreachable(f"{describe(claim)} not met within {deadline}s ({shown})")
+
+    monotone = rule.get("monotone")
+    if monotone is None or actual is None or holds:
+        return
+    past_bound = (
+        (monotone == "decreasing" and operator in (">=", "==") and actual < expected)
+        or (monotone == "increasing" and operator in ("<=", "==") and actual > expected)
+    )
+    if past_bound:
+        raise ClaimUnreachable(
+            f"{describe(claim)} cannot be met: {claim['metric']} is {monotone} "
+            f"and already {actual}"
+        )
+
+class ClaimWatcher:
+    """
+    Tails a container's metrics stream on a background thread and stops the
+    container as soon as one of `claims` becomes unreachable.
+
+    Only complete lines are consumed, so a half-written record is picked up
+    on the next poll; lines that are not JSON objects are ignored.
+    """
+
+    def __init__(
+        self,
+        container_name: str,
+        path: Path,
+        claims: List[dict],
+        interval: float = POLL_INTERVAL,
+    ):
+        self.container_name = container_name
+        self.path = path
+        self.claims = claims
+        self.interval = interval
+        self.latest: Dict[str, float] = {}
+        self.reason: Optional[str] = None
+        self._offset = 0
+        self._partial = b""
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        # A stream left over from an earlier run must not count towards this one.
+        self.path.unlink(missing_ok=True)
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def _read_new(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        self._offset += len(chunk)
+
+        *lines, self._partial = (self._partial + chunk).split(b"\n")
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                self.latest.update(
+                    (k, v) for k, v in record.items()
+                    if isinstance(v, (int, float)) and not isinstance(v, bool)
+                )
+
+    def poll(self) -> None:
+        self._read_new()
+        elapsed = time.monotonic() - self._started
+        for claim in self.claims:
+            check_reachable(claim, self.latest.get(claim["metric"]), elapsed)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except ClaimUnreachable as e:
+                self.reason = str(e)
+                subprocess.run(
+                    ["docker", "stop", "-t", str(STOP_TIMEOUT), self.container_name],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                return
+            self._stop.wait(self.interval)
+
+    def stop(self) -> Optional[str]:
+        """Stop watching; returns why the container was stopped, if it was."""
+        self._stop.set()
+        self._thread.join()
+        return self.reason
@@ -0,0 +1,353 @@
+"""
+Local stand-in for the HEDA publish backend, for tests and offline use.
+Not part of the heda package.
+
+Implements the deduplicated publish protocol used by `heda publish`:
+
+    POST /publish/manifest  {"experiment_name", "files": [{"path", "digest", "size"}]}
+                            -> {"upload_id", "missing": [digest, ...]}
+    POST /publish/blobs     multipart: "upload_id" field, one "blobs" part per
+                            missing file, named by its SHA-256 digest
+    POST /publish/commit    {"upload_id"} -> {"experiment_id", "pr_url"}
+
+plus the legacy single-request POST /publish, and GET /stats with the number
+of request body bytes received. Blobs are stored once under
+<root>/blobs/, each published experiment under <root>/experiments/<id>/.
+
+    PYTHONPATH=. python tests/local_backend.py --root /tmp/heda-backend
+    HEDA_BACKEND_URL=http://127.0.0.1:8000 heda publish
+"""
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from heda.utils.hash_utils import HASH_ALGORITHM
+
+READ_CHUNK = 64 * 1024
+
+
+def _parse_headers(block: bytes) -> Dict[str, str]:
+    headers = {}
+    for line in block.decode("utf-8").split("\r\n"):
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _header_params(value: str) -> Dict[str, str]:
+    params = {}
+    for item in value.split(";")[1:]:
+        key, _, val = item.strip().partition("=")
+        params[key.lower()] = val.strip('"').replace("%22", '"')
+    return params
+
+
+def read_multipart(
+    stream: BinaryIO,
+    length: int,
+    boundary: str,
+    open_part: Callable[[str, Optional[str]], BinaryIO],
+) -> None:
+    """
+    Parse a multipart/form-data body of `length` bytes from `stream` without
+    holding it in memory. For each part, `open_part(name, filename)` returns
+    a writable sink the part's content is streamed into; it is closed when
+    the part ends.
+    """
+    delimiter = b"\r\n--" + boundary.encode("utf-8")
+    # The first boundary has no leading CRLF; adding one lets every
+    # boundary match the same delimiter.
+    buf = b"\r\n"
+    remaining = length
+    state = "preamble"
+    sink: Optional[BinaryIO] = None
+
+    while True:
+        if state in ("preamble", "body"):
+            index = buf.find(delimiter)
+            if index >= 0:
+                if sink is not None:
+                    sink.write(buf[:index])
+                    sink.close()
+                    sink = None
+                buf = buf[index + len(delimiter):]
+                state = "boundary"
+                continue
+            keep = len(delimiter) - 1
+            if sink is not None and len(buf) > keep:
+                sink.write(buf[:-keep])
+            buf = buf[-keep:] if len(buf) > keep else buf
+        elif state == "boundary" and len(buf) >= 2:
+            if buf[:2] == b"--":
+                return
+            buf = buf[2:]
+            state = "headers"
+            continue
+        elif state == "headers":
+            end = buf.find(b"\r\n\r\n")
+            if end >= 0:
+                headers = _parse_headers(buf[:end])
+                params = _header_params(headers.get("content-disposition", ""))
+                sink = open_part(params.get("name", ""), params.get("filename"))
+                buf = buf[end + 4:]
+                state = "body"
+                continue
+
+        if remaining <= 0:
+            raise ValueError("Truncated multipart body")
+        chunk = stream.read(min(READ_CHUNK, remaining))
+        if not chunk:
+            raise ValueError("Truncated multipart body")
+        remaining -= len(chunk)
+        buf += chunk
+
+
+def _check_entry(entry: dict) -> None:
+    digest = entry.get("digest", "")
+    if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+        raise ValueError(f"Invalid digest {digest!r}")
+    path = Path(entry.get("path", ""))
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        raise ValueError(f"Invalid path {entry.get('path')!r}")
+
+
+class _HashingSink:
+    """Writes a part to a temporary file while hashing it."""
+
+    def __init__(self, directory: Path):
+        fd, path = tempfile.mkstemp(dir=directory)
+        self.file = os.fdopen(fd, "wb")
+        self.path = Path(path)
+        self.sha = hashlib.new(HASH_ALGORITHM)
+
+    def write(self, data: bytes) -> None:
+        self.sha.update(data)
+        self.file.write(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _discard(parts: list) -> None:
+    """Remove the temporary files of parts that were not stored as blobs."""
+    for _, _, sink in parts:
+        sink.close()
+        sink.path.unlink(missing_ok=True)
+
+
+class _FieldSink:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    def close(self) -> None:
+        pass
+
+
+class LocalBackend:
+    """Blob store and publish sessions on the local filesystem."""
+
+    def __init__(self, root: Path, dedup: bool = True):
+        self.root = root
+        self.dedup = dedup
+        self.blobs_dir = root / "blobs"
+        self.uploads_dir = root / "uploads"
+        self.experiments_dir = root / "experiments"
+        self.tmp_dir = root / "tmp"
+        for directory in (self.blobs_dir, self.uploads_dir, self.experiments_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def has_blob(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def store_blob(self, sink: _HashingSink, expected: Optional[str] = None) -> str:
+        digest = sink.sha.hexdigest()
+        if expected is not None and expected != digest:
+            sink.path.unlink()
+            raise ValueError(f"Blob content does not match its digest {expected}")
+        target = self.blob_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(sink.path, target)
+        return digest
+
+    def open_manifest(self, experiment_name: str, files: List[dict]) -> dict:
+        for entry in files:
+            _check_entry(entry)
+        upload_id = secrets.token_hex(8)
+        (self.uploads_dir / f"{upload_id}.json").write_text(
+            json.dumps({"experiment_name": experiment_name, "files": files})
+        )
+        missing = sorted({f["digest"] for f in files if not self.has_blob(f["digest"])})
+        return {"upload_id": upload_id, "missing": missing}
+
+    def load_upload(self, upload_id: str) -> dict:
+        if not upload_id.isalnum():
+            raise KeyError(upload_id)
+        path = self.uploads_dir / f"{upload_id}.json"
+        if not path.exists():
+            raise KeyError(upload_id)
+        return json.loads(path.read_text())
+
+    def commit(self, experiment_name: str, files: List[dict]) -> dict:
+        """Assemble an experiment from stored blobs (the stand-in for a pull request)."""
+        experiment_id = f"{experiment_name}-{secrets.token_hex(4)}"
+        experiment_dir = self.experiments_dir / experiment_id
+        for entry in files:
+            _check_entry(entry)
+            target = experiment_dir / "files" / entry["path"]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self.blob_path(entry["digest"]), target)
+            except OSError:
+                shutil.copyfile(self.blob_path(entry["digest"]), target)
+        (experiment_dir / "manifest.json").write_text(json.dumps(files, indent=2))
+        return {"experiment_id": experiment_id, "pr_url": experiment_dir.resolve().as_uri()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend: LocalBackend
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _length(self) -> int:
+        length = int(self.headers.get("Content-Length", 0))
+        with self.backend._lock:
+            self.backend.bytes_received += length
+        return length
+
+    def _read_json(self) -> dict:
+        return json.loads(self.rfile.read(self._length()) or b"{}")
+
+    def _read_multipart(self) -> tuple:
+        """Returns (form fields, [(part name, filename, sink), ...])."""
+        content_type = self.headers.get("Content-Type", "")
+        boundary = _header_params(content_type).get("boundary")
+        if not content_type.startswith("multipart/form-data") or not boundary:
+            raise ValueError("Expected multipart/form-data")
+
+        fields: Dict[str, _FieldSink] = {}
+        parts = []
+
+        def open_part(name: str, filename: Optional[str]):
+            if filename is None:
+                fields[name] = _FieldSink()
+                return fields[name]
+            sink = _HashingSink(self.backend.tmp_dir)
+            parts.append((name, filename, sink))
+            return sink
+
+        try:
+            read_multipart(self.rfile, self._length(), boundary, open_part)
+        except Exception:
+            _discard(parts)
+            raise
+        return {name: f.data.decode("utf-8") for name, f in fields.items()}, parts
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {"bytes_received": self.backend.bytes_received})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        dedup_routes = ("/publish/manifest", "/publish/blobs", "/publish/commit")
+        if self.path in dedup_routes and not self.backend.dedup:
+            self.rfile.read(self._length())
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            if self.path == "/publish/manifest":
+                payload = self._read_json()
+                self._send_json(200, self.backend.open_manifest(payload["experiment_name"], payload["files"]))
+
+            elif self.path == "/publish/blobs":
+                # The upload id is a form field, so the body has to be read
+                # before it can be checked; drop the parts if it is unknown.
+                fields, parts = self._read_multipart()
+                try:
+                    self.backend.load_upload(fields.get("upload_id", ""))
+                    stored = [self.backend.store_blob(sink, expected=filename) for _, filename, sink in parts]
+                finally:
+                    _discard(parts)
+                self._send_json(200, {"stored": stored})
+
+            elif self.path == "/publish/commit":
+                upload = self.backend.load_upload(self._read_json().get("upload_id", ""))
+                missing = sorted({
+                    f["digest"] for f in upload["files"] if not self.backend.has_blob(f["digest"])
+                })
+                if missing:
+                    self._send_json(409, {"error": "missing blobs", "missing": missing})
+                    return
+                self._send_json(200, self.backend.commit(upload["experiment_name"], upload["files"]))
+
+            elif self.path == "/publish":
+                fields, parts = self._read_multipart()
+                files = []
+                try:
+                    for _, filename, sink in parts:
+                        size = sink.path.stat().st_size
+                        files.append({"path": filename, "digest": self.backend.store_blob(sink), "size": size})
+                finally:
+                    _discard(parts)
+                self._send_json(200, self.backend.commit(fields.get("experiment_name", "experiment"), files))
+
+            else:
+                self._send_json(404, {"error": "not found"})
+        except KeyError as e:
+            self._send_json(404, {"error": f"unknown upload {e}"})
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+
+
+def serve(root: Path, host: str = "127.0.0.1", port: int = 8000, dedup: bool = True) -> ThreadingHTTPServer:
+    """Create (but do not start) a server backed by `root`."""
+    handler = type("Handler", (_Handler,), {"backend": LocalBackend(root, dedup=dedup)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the HEDA publish backend.")
+    parser.add_argument("--root", type=Path, default=Path(".heda/local-backend"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Only offer the legacy single-request /publish endpoint.")
+    args = parser.parse_args()
+
+    server = serve(args.root, args.host, args.port, dedup=not args.no_dedup)
+    print(f"HEDA local backend on http://{args.host}:{args.port} (root: {args.root})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import io
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from heda import publish
+from heda.utils import httputils
+from heda.utils.hash_utils import hash_file
+from heda.utils.multipart import MultipartStream
+
+import local_backend
+from local_backend import read_multipart, serve
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """A running local backend, with heda's HTTP client pointed at it."""
+    server = serve(tmp_path / "backend", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"access_token": "test-token"}))
+    monkeypatch.setattr(httputils, "CONFIG_FILE", config)
+    monkeypatch.setattr(httputils, "_config_cache", None)
+    monkeypatch.setattr(httputils, "BACKEND_URL", f"http://127.0.0.1:{server.server_port}")
+
+    yield server.RequestHandlerClass.backend
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def experiment(tmp_path, monkeypatch):
+    """An experiment directory with a few files to publish, as the cwd."""
+    root = tmp_path / "experiment"
+    (root / "src").mkdir(parents=True)
+    (root / "data").mkdir()
+    (root / "src" / "main.py").write_text("print('hello')\n")
+    (root / "data" / "train.csv").write_text("x,y\n1,2\n")
+    (root / "data" / "copy.csv").write_text("x,y\n1,2\n")
+    monkeypatch.chdir(root)
+    return [Path("src/main.py"), Path("data/train.csv"), Path("data/copy.csv")]
+
+
+def _open_session(files):
+    manifest = publish.build_publish_manifest(files)
+    session = httputils.post_json(
+        "/publish/manifest", {"experiment_name": "demo", "files": manifest}
+    )
+    return manifest, session
+
+
+def _published_files(backend, experiment_id):
+    root = backend.experiments_dir / experiment_id / "files"
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in root.rglob("*") if p.is_file()}
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 64 * 1024])
+def test_read_multipart_round_trip(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(local_backend, "READ_CHUNK", chunk)
+    payload = tmp_path / "payload.bin"
+    # Contains something that looks like a delimiter but is not one.
+    payload.write_bytes(b"a\r\n--heda\r\n" + bytes(range(256)) * 50)
+    body = MultipartStream([("blobs", "payload.bin", payload)], fields={"upload_id": "abc"})
+    raw = body.read()
+
+    parts = {}
+
+    def open_part(name, filename):
+        parts[(name, filename)] = io.BytesIO()
+        parts[(name, filename)].close = lambda: None
+        return parts[(name, filename)]
+
+    read_multipart(io.BytesIO(raw), len(raw), body.boundary, open_part)
+
+    assert parts[("upload_id", None)].getvalue() == b"abc"
+    assert parts[("blobs", "payload.bin")].getvalue() == payload.read_bytes()
+
+
+def test_read_multipart_truncated_body():
+    body = b"--b\r\nContent-Disposition: form-data; name=\"x\"\r\n\r\nvalue"
+    with pytest.raises(ValueError):
+        read_multipart(io.BytesIO(body), len(body), "b", lambda name, filename: io.BytesIO())
+
+
+def test_publish_uploads_only_missing_blobs(backend, experiment):
+    manifest, session = _open_session(experiment)
+    # The two identical CSVs share one blob.
+    assert len(session["missing"]) == 2
+
+    result = publish.publish_missing(session, manifest)
+    assert _published_files(backend, result["experiment_id"]) == {
+        f.as_posix(): f.read_bytes() for f in experiment
+    }
+
+    Path("src/main.py").write_text("print('changed')\n")
+    manifest, session = _open_session(experiment)
+    assert session["missing"] == [hash_file(Path("src/main.py"))]
+
+    received = backend.bytes_received
+    result = publish.publish_missing(session, manifest)
+    assert _published_files(backend, result["experiment_id"])["src/main.py"] == b"print('changed')\n"
+    assert backend.bytes_received - received < 2048
+
+
+def test_commit_with_missing_blobs_is_rejected(backend, experiment):
+    _, session = _open_session(experiment)
+
+    with pytest.raises(httputils.RequestError) as e:
+        httputils.post_json("/publish/commit", {"upload_id": session["upload_id"]})
+    assert e.value.status_code == 409
+    assert json.loads(str(e.value).split(": ", 1)[1])["missing"] == session["missing"]
+
+
+def test_blobs_for_unknown_upload_leave_no_temp_files(backend, experiment):
+    with pytest.raises(httputils.RequestError) as e:
+        httputils.post_multipart(
+            "/publish/blobs",
+            files=[experiment[0]],
+            names=[hash_file(experiment[0])],
+            field="blobs",
+            form_data={"upload_id": "doesnotexist"},
+        )
+    assert e.value.status_code == 404
+    assert list(backend.tmp_dir.iterdir()) == []
+
+
+def test_blob_not_matching_its_digest_is_rejected(backend, experiment):
+    _, session = _open_session(experiment)
+
+    with pytest.raises(httputils.RequestError) as e:
+        httputils.post_multipart(
+            "/publish/blobs",
+            files=[experiment[0]],
+            names=[hash_file(experiment[1])],
+            field="blobs",
+            form_data={"upload_id": session["upload_id"]},
+        )
+    assert e.value.status_code == 400
+    assert list(backend.tmp_dir.iterdir()) == []
+
+
+def test_legacy_publish_without_dedup(backend, experiment):
+    backend.dedup = False
+
+    with pytest.raises(httputils.RequestError) as e:
+        _open_session(experiment)
+    assert e.value.status_code == 404
+
+    result = publish.publish_full("demo", experiment)
+    assert _published_files(backend, result["experiment_id"]) == {
+        f.as_posix(): f.read_bytes() for f in experiment
+    }
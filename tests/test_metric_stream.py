@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from heda.check import load_metrics
+from heda.utils.metric_stream import aggregate_records, quantile
+
+
+def _exact(values, p):
+    return quantile(sorted(values), p)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [2 * 0.995 ** i for i in range(10_000)],
+        [1 / (i + 1) for i in range(1_000)],
+        [float(i) for i in range(5_000)],
+    ],
+    ids=["exp-decay", "harmonic", "increasing"],
+)
+def test_quantiles_of_monotone_streams_are_exact(values):
+    records = ({"loss": v} for v in values)
+    result = aggregate_records(records, {"loss": {"p50", "p95", "p99"}})["loss"]
+
+    for name, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        assert result[name] == pytest.approx(_exact(values, p))
+
+
+def test_aggregates_skip_non_numeric_values():
+    records = [{"loss": 3}, {"loss": "nan"}, {"loss": True}, {"other": 1}, {"loss": 1}]
+    result = aggregate_records(records, {"loss": {"count", "mean", "first", "last", "p50"}, "gone": {"max"}})
+
+    assert result["loss"] == {"count": 2, "mean": 2.0, "first": 3, "last": 1, "p50": 2.0}
+    assert result["gone"] == {"max": None}
+
+
+def test_p95_claim_on_decaying_loss_fails(tmp_path):
+    stream = tmp_path / "metrics.jsonl"
+    stream.write_text("".join(json.dumps({"loss": 2 * 0.995 ** i}) + "\n" for i in range(10_000)))
+    claim = {"metric": "loss", "operator": "<=", "value": 0.01, "aggregate": "p95"}
+
+    metrics = load_metrics(tmp_path / "metrics.json", [claim])
+
+    assert metrics["p95(loss)"] == pytest.approx(0.1632, abs=1e-4)
+    assert metrics["p95(loss)"] > claim["value"]
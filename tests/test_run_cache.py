@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from heda.utils import run_cache
+
+
+def _outputs(root: Path, accuracy: str) -> Path:
+    outputs = root / "outputs"
+    (outputs / "cells").mkdir(parents=True, exist_ok=True)
+    (outputs / "metrics.json").write_text(accuracy)
+    (outputs / "cells" / "log.txt").write_text("done\n")
+    return outputs
+
+
+def test_store_and_restore_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outputs = _outputs(Path("."), "0.9")
+    cache_dir = tmp_path / "cache"
+
+    run_cache.store("key", [outputs], {"claims_passed": True}, cache_dir)
+    (outputs / "metrics.json").unlink()
+    run_cache.restore("key", [outputs], cache_dir)
+
+    assert run_cache.lookup("key", cache_dir)["claims_passed"] is True
+    assert (outputs / "metrics.json").read_text() == "0.9"
+    assert (outputs / "cells" / "log.txt").read_text() == "done\n"
+
+
+def test_release_keeps_cached_outputs_from_in_place_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outputs = _outputs(Path("."), "0.9")
+    cache_dir = tmp_path / "cache"
+    run_cache.store("key", [outputs], {"claims_passed": True}, cache_dir)
+
+    run_cache.release([outputs])
+    _outputs(Path("."), "0.5")
+    run_cache.restore("key", [outputs], cache_dir)
+
+    assert (outputs / "metrics.json").read_text() == "0.9"